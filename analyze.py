@@ -1,18 +1,33 @@
+"""
+    Analysis of the downloaded HDR shorts, as a library and a command line with one subcommand per step
+    - scan: probes every video of the dataset folders once and writes the stats table (scan_stats)
+    - classify: HDR, vertical and HDR vertical lists of the videos, from the stats table (classify)
+    - runtime-stats: run time statistics and histogram of the HDR vertical shorts (runtime_stats)
+    - batch-export: the HDR vertical list in batches of 500 videos (batch_export)
+    - info: adds the mediainfo columns to the csv files (update_csv_files)
+
+    NOTE: importing the module does not touch the dataset; pymediainfo, joblib, matplotlib and seaborn are imported
+    by the functions that use them, so the light subcommands only load pandas.
+
+    Usage:
+    python analyze.py scan --base_path /media/.../YT-HDR/
+    python analyze.py classify
+    python analyze.py batch-export
+    python analyze.py runtime-stats --csv_file csv_files/True_HDR_Vertical_Shorts_list.csv
+    python analyze.py info --csv_glob "csv_files/*.csv"
+
+"""
+
 import os 
 import glob 
-import numpy as np 
-import pandas as pd
+import argparse
 import statistics 
+import json 
 
-from pymediainfo import MediaInfo as mi
-import ffmpeg as fpeg
-import ffprobe as fprobe
-
-from matplotlib import pyplot as plt 
-import seaborn as sns
+import numpy as np 
+import pandas as pd
 
-import subprocess
-import json 
+from probe_cache import get_probe_cache
 
 #helper function 
 def get_number(s):
@@ -26,70 +41,162 @@ base_path = "/media/ss223464/Expansion/Shreshth_LIVE/Datasets/YT-HDR/"
 YT8M_10K_keywords = "CC_HDR_under4_video_#shorts_10k_wordlist_8m_entities.csv"
 urbandict2dot5_keywords = "CC_HDR_under4_video_#shorts_urbandict-2dot5M.csv"
 raw_vid_folders = ["HDR_#Shorts_YT_keywords_8M_10kwords/", "HDR_#shorts_YT_urbandict-2dot5M/"]
+# probes of the videos (pymediainfo, mediainfo); unchanged files are not probed again
+probe_cache_file = "probe_cache.sqlite"
 
-#listing all unique downloaded videos
-raw_vids_8M_10K = os.listdir(base_path+raw_vid_folders[0])
-raw_vids_urbandict2dot5 = os.listdir(base_path+raw_vid_folders[1])
-raw_vids_all = raw_vids_8M_10K+raw_vids_urbandict2dot5
-#counting total videos 
-count_8M_10K = len(raw_vids_8M_10K)
-count_urbandict2dot5 = len(raw_vids_urbandict2dot5)
-count_total_vids = count_8M_10K + count_urbandict2dot5
-print("Total Video in 8M_10K: {}; Total Video in urbandict2dot5: {}; Total Video: {}.".format(count_8M_10K, count_urbandict2dot5, count_total_vids))
+# per file stats of all videos, written by scan_stats
+stats_file = "video_stats.parquet"
+video_extensions = ['webm', 'mp4']
+
+#(folder, name) of the videos of each folder, one pass with os.scandir
+def iter_videos(folders, extensions=video_extensions):
+    for folder in folders:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.split('.')[-1] in extensions:
+                    yield folder, entry.name
 
 #checking primaries and video shape
 
+#pymediainfo tracks of a file as dicts, through the probe cache
+def parse_media(file_name):
+    from pymediainfo import MediaInfo as mi
+    return get_probe_cache(probe_cache_file).get(file_name, 'pymediainfo', lambda f: mi.parse(f).to_data())
+
+# columns of the stats table
+stats_schema = {"ID": "string", "Name(+Duration)": "string", "Base_Path": "string", "color_prims": "string", "transfer": "string",
+                "Height": "int64", "Width": "int64", "duration": "float64", "bitrate": "float64"}
+
+#stats record of the first video track of a file, None if it has no video track
+def probe_stats(address, name):
+    tracks = parse_media(address+name)['tracks']
+    general = next((t for t in tracks if t['track_type'] == 'General'), {})
+    video = next((t for t in tracks if t['track_type'] == 'Video'), None)
+    if video is None:
+        return None
+    #get the YT Video ID (split name with '_' and take [0]) - verify. Might be the case where actual name/ID includes '_'!
+    duration = video.get('duration') or general.get('duration')
+    bitrate = video.get('bit_rate') or general.get('overall_bit_rate')
+    return {"ID": "_".join(name.split('.')[0].split("_")[:-1]), "Name(+Duration)": name, "Base_Path": address,
+            "color_prims": video.get('color_primaries'), "transfer": video.get('transfer_characteristics'),
+            "Height": video.get('height'), "Width": video.get('width'),
+            "duration": float(duration)/1000 if duration else None, "bitrate": float(bitrate) if bitrate else None}
+
+class stats_writer():
+    '''
+        Appends batches of stats records to a parquet file; a csv file if pyarrow is not installed
+    '''
+    def __init__(self, out_file):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            pa = None
+            out_file = os.path.splitext(out_file)[0] + '.csv'
+        self.pa = pa
+        self.out_file = out_file
+        self.writer = None
+        if pa is not None:
+            schema = pa.schema([(column, pa.type_for_alias(dtype)) for column, dtype in stats_schema.items()])
+            self.writer = pq.ParquetWriter(out_file, schema)
+        else:
+            pd.DataFrame(columns=list(stats_schema)).to_csv(out_file, index=False)
+
+    def write(self, records):
+        columns = {column: [r[column] for r in records] for column in stats_schema}
+        if self.writer is not None:
+            self.writer.write_table(self.pa.table(columns, schema=self.writer.schema))
+        else:
+            pd.DataFrame(columns).to_csv(self.out_file, mode='a', header=False, index=False)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+#read the stats table written by scan_stats
+def load_stats(out_file=stats_file):
+    if out_file.endswith('.csv') or not os.path.exists(out_file):
+        df_stats = pd.read_csv(os.path.splitext(out_file)[0] + '.csv', dtype={c: str for c, dtype in stats_schema.items() if dtype == "string"})
+    else:
+        df_stats = pd.read_parquet(out_file)
+    #missing strings as None, as in the records
+    strings = [c for c, dtype in stats_schema.items() if dtype == "string"]
+    df_stats[strings] = df_stats[strings].astype(object).where(df_stats[strings].notna(), None)
+    return df_stats.astype({"Height": "Int64", "Width": "Int64"})
+
+def scan_stats(folders, out_file=stats_file, n_jobs=-1, batch_size=1000):
+    '''
+        Probes every video of the folders once, in parallel, and writes one stats record per file
+
+        Args:
+        - folders (list): dataset folders (ending with '/')
+        - out_file (str): parquet file of the stats; a csv next to it without pyarrow
+        - n_jobs (int): worker processes running pymediainfo
+        - batch_size (int): records written at once
+
+        Returns:
+        - DataFrame: the stats table, sorted by folder and name
+    '''
+    from joblib import Parallel, delayed
+    writer = stats_writer(out_file)
+    records = Parallel(n_jobs=n_jobs, return_as="generator_unordered")(delayed(probe_stats)(folder, name) for folder, name in iter_videos(folders))
+    batch = []
+    for record in records:
+        if record is not None:
+            batch.append(record)
+        if len(batch) >= batch_size:
+            writer.write(batch)
+            batch = []
+    if batch:
+        writer.write(batch)
+    writer.close()
+    return load_stats(writer.out_file).sort_values(["Base_Path", "Name(+Duration)"], ignore_index=True)
+
 #Directly count
-def count_stats(address, dataset_vid):
-    color_bt2020 = 0
-    vertical = 0
-    for i in dataset_vid:
-        output = mi.parse(address+i)
-        for track in output.tracks:
-            if track.track_type == 'Video':
-                output = track.color_primaries        
-                if output == "BT.2020": 
-                    color_bt2020 += 1
-                widht = track.width
-                height = track.height
-                if widht < height: 
-                    vertical += 1
+def count_stats(df_stats):
+    color_bt2020 = int((df_stats["color_prims"] == "BT.2020").sum())
+    vertical = int((df_stats["Width"] < df_stats["Height"]).sum())
     return color_bt2020, vertical
 
 #return stats for each file
-def check_stats(address, dataset_vid):
-    color_primaries = []
-    shape_HxW = []
-    for i in dataset_vid:
-        output = mi.parse(address+i)
-        for track in output.tracks:
-            if track.track_type == 'Video':
-                output = track.color_primaries        
-                color_primaries.append(output)
-                width = track.width
-                height = track.height
-                shape_HxW.append([height,width])
+def check_stats(df_stats):
+    color_primaries = df_stats["color_prims"].to_list()
+    shape_HxW = df_stats[["Height", "Width"]].values.tolist()
     return color_primaries, shape_HxW
 
-#updated list  
-raw_vids_8M_10K = [i for i in raw_vids_8M_10K if i.split('.')[-1] == 'webm' or i.split('.')[-1] == 'mp4']
-raw_vids_urbandict2dot5 = [i for i in raw_vids_urbandict2dot5 if i.split('.')[-1] == 'webm' or i.split('.')[-1] == 'mp4']
-
-#get the array for color prim and HxW
-if False:        
-    color_prim_8M_10K, HXW_8M_10K = check_stats(base_path+raw_vid_folders[0], raw_vids_8M_10K)
-    color_prim_urbandict, HXW_urbandict = check_stats(base_path+raw_vid_folders[1], raw_vids_urbandict2dot5)
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+"""
+    Subcommands
+"""
+def scan(folders, out_file=stats_file, n_jobs=-1):
+    '''
+        Stats table of all videos, with the counts of each folder
+    '''
+    df_stats = scan_stats(folders, out_file, n_jobs=n_jobs)
+    for folder, count in df_stats["Base_Path"].value_counts(sort=False).items():
+        print("Total Video in {}: {}".format(folder, count))
+    color_bt2020, vertical = count_stats(df_stats)
+    print("Total Video: {}; BT.2020 videos: {}; Vertical videos: {}.".format(len(df_stats), color_bt2020, vertical))
+    return df_stats
+
+def classify(df_stats, excel=True):
+    '''
+        Writes the lists of analyzed, removed, HDR, vertical and HDR vertical videos
 
+        Args:
+        - df_stats (DataFrame): the stats table of scan_stats
+        - excel (bool): also write each list as xlsx
 
-    #get the YT Video ID (split name with '_' and take [0]) - verify. Might be the case where actual name/ID includes '_'!
-    all_names = raw_vids_8M_10K+raw_vids_urbandict2dot5 
-    all_ids = ["_".join(i.split('.')[0].split("_")[:-1]) for i in all_names]
-
+        Returns:
+        - DataFrame: the HDR vertical videos
+    '''
     #Gettting relevant columns
-    base_path_ids = [base_path+raw_vid_folders[0]]*len(raw_vids_8M_10K) + [base_path+raw_vid_folders[1]]*len(raw_vids_urbandict2dot5)
-    color_prims = color_prim_8M_10K + color_prim_urbandict
-    Heights = [i[0] for i in HXW_8M_10K] + [i[0] for i in HXW_urbandict]
-    Widths = [i[1] for i in HXW_8M_10K] + [i[1] for i in HXW_urbandict]
+    all_ids = df_stats["ID"].to_list()
+    all_names = df_stats["Name(+Duration)"].to_list()
+    base_path_ids = df_stats["Base_Path"].to_list()
+    color_prims, HXW = check_stats(df_stats)
+    Heights = [i[0] for i in HXW]
+    Widths = [i[1] for i in HXW]
     start_time = [0]*len(base_path_ids)
     end_time = [get_number(i.split('.')[0].split("_")[-1]) for i in all_names]
     #may add more columns based on features/Info needed
@@ -108,19 +215,16 @@ if False:
         }
     )
 
-    #keep raw 
-    df_raw = df.copy()
-
     #clean the dataframe 
     #clean: remove all None duration videos and save them as separate csv. These are the video which i have downloaded but removed from YT. 
     df_removed_shorts = df[df['Name(+Duration)'].str.contains('_None')]
     df_removed_shorts.to_csv("Analyzed_HDR_Shorts_list_YT_Removed.csv", index=False)
-    if True: 
+    if excel: 
         df_removed_shorts.to_excel("Analyzed_HDR_Shorts_list_YT_Removed.xlsx", index=False)
 
     df = df[~df['Name(+Duration)'].str.contains('_None')]
     df.to_csv("Analyzed_HDR_Shorts_list.csv")
-    if True:
+    if excel:
         df.to_excel("Analyzed_HDR_Shorts_list.xlsx", index=False)
 
     # clean and drop duplicates // There are no duplicates but to be on the safe side.
@@ -130,44 +234,58 @@ if False:
     # HDR videos    
     df_hdr = df[df['color_prims']=='BT.2020']
     df_hdr.to_csv("True_HDR_Shorts_list.csv")
-    if True:
+    if excel:
         df_hdr.to_excel("True_HDR_Shorts_list.xlsx", index=False)
 
     # vertical videos
     df_vertical = df[df['Height'] > df['Width']]
     df_vertical.to_csv("True_Vertical_Shorts_list.csv")
-    if True:
+    if excel:
         df_vertical.to_excel("True_Vertical_Shorts_list.xlsx", index=False)
 
     # True HDR vertical videos
     df_shorts = df_hdr[df_hdr['Height'] > df_hdr['Width']]
     df_shorts.to_csv("True_HDR_Vertical_Shorts_list.csv")
-    if True:
+    if excel:
         df_shorts.to_excel("True_HDR_Vertical_Shorts_list.xlsx", index=False)
+    return df_shorts
 
+def batch_export(csv_file="True_HDR_Vertical_Shorts_list.csv", batch_size=500, excel=True):
+    '''
+        Splits the HDR vertical list into csv files of batch_size videos; the last incomplete batch is not written
+    '''
     #making batches for true_hdr
-    df_hdr_vertical = pd.read_csv("True_HDR_Vertical_Shorts_list.csv")
-    for i in range(len(df_hdr_vertical)//500): 
-        df_hdr_vertical[i*500:(i+1)*500].to_csv("True_HDR_Vertical_Shorts_Batch_{}.csv".format(i+1), index=False)
-        if True:
-            df_hdr_vertical[i*500:(i+1)*500].to_excel("True_HDR_Vertical_Shorts_Batch_{}.xlsx".format(i+1), index=False)
+    df_hdr_vertical = pd.read_csv(csv_file)
+    for i in range(len(df_hdr_vertical)//batch_size): 
+        df_hdr_vertical[i*batch_size:(i+1)*batch_size].to_csv("True_HDR_Vertical_Shorts_Batch_{}.csv".format(i+1), index=False)
+        if excel:
+            df_hdr_vertical[i*batch_size:(i+1)*batch_size].to_excel("True_HDR_Vertical_Shorts_Batch_{}.xlsx".format(i+1), index=False)
 
 
 """
 analyzing the average play time and estimations for total volume of data after clipping/trimming. 
 
 """
-if False:
+def runtime_stats(csv_file="csv_files/True_HDR_Vertical_Shorts_list.csv", clip_duration=10, plot_file="Average_Runtime_Dist.png"):
+    '''
+        Prints the run time statistics of the videos of csv_file, and plots their histogram and KDE in plot_file
+
+        Args:
+        - csv_file (str): list of videos, with an "end_time" column
+        - clip_duration (int): run time of each clip, in secs; 7-10 secs per short clip
+        - plot_file (str): image of the plot
+    '''
+    from matplotlib import pyplot as plt 
+    import seaborn as sns
+
     # Only for True HDR Short videos
-    df_hdr_vertical = pd.read_csv("csv_files/True_HDR_Vertical_Shorts_list.csv")
+    df_hdr_vertical = pd.read_csv(csv_file)
     run_times = df_hdr_vertical["end_time"].to_list()
 
     min_runtime, max_runtime, median_runtime, avg_runtime = np.min(run_times), np.max(run_times), statistics.median(run_times), np.mean(run_times)
     print("Run times for all True HDR Short Videos. Min: {}, Max: {}, Median: {}, Mean: {},".format(min_runtime, max_runtime, median_runtime, avg_runtime))
 
     # Create a column which shows the number of clips which can be created from raw based on trimming/clipping.
-    # Assume each short clip run time to be: 7-10 secs. 
-    clip_duration = 10 #in secs
     total_videos = sum([i//clip_duration +1 for i in run_times])
     print("Original Video Count:{}".format(len(run_times)))
     print("Clipped Video Count:{}".format(total_videos))
@@ -204,7 +322,7 @@ if False:
 
     # Display the figure
     #plt.show()
-    plt.savefig("Average_Runtime_Dist.png")
+    plt.savefig(plot_file)
 
 
 """
@@ -216,146 +334,134 @@ Sanity check for all True HDR Shorts videos
 
 #!mediainfo '/media/ss223464/Expansion/Shreshth_LIVE/Datasets/YT-HDR/HDR_#Shorts_YT_keywords_8M_10kwords/xvi3bEmCCDs_41.webm'
     
-# You can now use the 'info_dict' variable to access the information in a structured way
-def get_info_dict(file_name):
-        
-    ''' Typical Output
-    General
-    Complete name                            : /media/ss223464/Expansion/Shreshth_LIVE/Datasets/YT-HDR/HDR_#Shorts_YT_keywords_8M_10kwords/xvi3bEmCCDs_41.webm
-    Format                                   : WebM
-    Format version                           : Version 4
-    File size                                : 107 MiB
-    Duration                                 : 40 s 833 ms
-    Overall bit rate                         : 22.0 Mb/s
-    Writing application                      : google/video-file
-    Writing library                          : google/video-file
-
-    Video
-    ID                                       : 1
-    Format                                   : VP9
-    HDR format                               : SMPTE ST 2086, HDR10 compatible
-    Codec ID                                 : V_VP9
-    Duration                                 : 40 s 833 ms
-    Bit rate                                 : 21.1 Mb/s
-    Width                                    : 2 160 pixels
-    Height                                   : 3 840 pixels
-    Display aspect ratio                     : 0.562
-    Frame rate mode                          : Constant
-    Frame rate                               : 24.000 FPS
-    Color space                              : YUV
-    Bits/(Pixel*Frame)                       : 0.106
-    Stream size                              : 103 MiB (96%)
-    Language                                 : English
-    Default                                  : Yes
-    Forced                                   : No
-    Color range                              : Limited
-    Color primaries                          : BT.2020
-    Transfer characteristics                 : HLG
-    Matrix coefficients                      : BT.2020 non-constant
-    Mastering display color primaries        : Display P3
-    Mastering display luminance              : min: 0.0050 cd/m2, max: 1000 cd/m2
+# columns added by update_csv_info, with their key in the mediainfo JSON (General and Video tracks, Video first)
+# the "_String" variant of a key, as printed by mediainfo, is used when there is one
+# Width and Height are left out, the csv already has them as numbers
+temp_info_keys = {
+    "Format": "Format",
+    "Format version": "Format_Version",
+    "File size": "FileSize",
+    "Duration": "Duration",
+    "Overall bit rate": "OverallBitRate",
+    "Writing application": "Encoded_Application",
+    "Writing library": "Encoded_Library",
+    "HDR format": "HDR_Format",
+    "Codec ID": "CodecID",
+    "Bit rate": "BitRate",
+    "Display aspect ratio": "DisplayAspectRatio",
+    "Frame rate mode": "FrameRate_Mode",
+    "Frame rate": "FrameRate",
+    "Color space": "ColorSpace",
+    "Bits/(Pixel*Frame)": "BitsPixel_Frame",
+    "Stream size": "StreamSize",
+    "Language": "Language",
+    "Default": "Default",
+    "Forced": "Forced",
+    "Color range": "colour_range",
+    "Color primaries": "colour_primaries",
+    "Transfer characteristics": "transfer_characteristics",
+    "Matrix coefficients": "matrix_coefficients",
+    "Mastering display color primaries": "MasteringDisplay_ColorPrimaries",
+    "Mastering display luminance": "MasteringDisplay_Luminance",
+    }
+
+#mediainfo JSON of a file, reduced to the temp_info_keys columns
+def parse_info_columns(file_name):
+    from pymediainfo import MediaInfo as mi
+    media = json.loads(mi.parse(file_name, output="JSON"))["media"]
+    tracks = {}
+    for track in media["track"] if media else []:
+        if track["@type"] in ["General", "Video"]:
+            tracks.setdefault(track["@type"], track)
+    #merge the "General" and "Video" sections
+    info = {column: '' for column in temp_info_keys}
+    for section in ["General", "Video"]:
+        track = tracks.get(section, {})
+        for column, key in temp_info_keys.items():
+            value = track.get(key+"_String", track.get(key))
+            if value is not None:
+                info[column] = value
+    return info
+
+#info columns of a file through the probe cache; runs in the worker processes of update_csv_info
+def get_info_columns(file_name, cache_file):
+    if not os.path.isfile(file_name):
+        return {column: '' for column in temp_info_keys}
+    return get_probe_cache(cache_file).get(file_name, 'mediainfo_columns', parse_info_columns)
+
+def update_csv_info(df_csv, n_jobs=-1, batch_size=64):
     '''
+        Adds the temp_info_keys columns to the csv of videos, from the mediainfo JSON of every file
 
-    #"mediainfo /media/ss223464/Expansion/Shreshth_LIVE/Datasets/YT-HDR/HDR_#Shorts_YT_keywords_8M_10kwords/xvi3bEmCCDs_41.webm"
-    output = subprocess.check_output("mediainfo "+file_name, shell=True).decode()
-
-    info_dict = {}
-    current_section = None
-
-    lines = output.split('\n')
-    for line in lines:
-        line = line.strip()
-        if line:
-            if ':' not in line:
-                section = line[:]
-                info_dict[section] = {}
-                current_section = section
-            elif ':' in line:
-                key, value = line.split(':', 1)
-                info_dict[current_section][key.strip()] = value.strip()
-
-    #Remove un-necessary keys 
-    """
-    'Complete name' in General section
-    'ID' in video section 
-    'Height' in video section 
-    'Width' in video section 
-    """
-    info_dict['General'].pop('Complete name')
-    info_dict['Video'].pop('ID')
-    info_dict['Video'].pop('Width')
-    info_dict['Video'].pop('Height')
-
-    return info_dict
-
-temp_info_keys = [
-    "Format"
-    "Format version"
-    "File size"
-    "Duration"
-    "Overall bit rate"
-    "Writing application"
-    "Writing library"
-    "Format"
-    "HDR format"
-    "Codec ID"
-    "Duration"
-    "Bit rate"
-    "Width"
-    "Height"
-    "Display aspect ratio"
-    "Frame rate mode"
-    "Frame rate"
-    "Color space"
-    "Bits/(Pixel*Frame)"
-    "Stream size"
-    "Language"
-    "Default"
-    "Forced"
-    "Color range"
-    "Color primaries"
-    "Transfer characteristics"
-    "Matrix coefficients"
-    "Mastering display color primaries"
-    "Mastering display luminance"
-    ]
-
-def update_csv_info(df_csv):
-    list_info_dict = []
-    for i,name in enumerate(df_csv["Name(+Duration)"].to_list()):
-        file_name = df_csv["Base_Path"][i]+name
-        info_dict = get_info_dict(file_name)
-        #merge the "General" and "Video" sections
-        list_info_dict.append({**info_dict["General"], **info_dict["Video"]})
-
-    #Add keys as new columns in the existing dataframe.    
-    for i in temp_info_keys:
-        df_csv[i] = ''
-
-    #add the values from info dict 
-    for i,info_dict in enumerate(list_info_dict):
-        df_csv.loc[i, list(info_dict.keys())] = list(info_dict.values())
-
-    return df_csv
-
-# For example, print the complete name and video format
-#list of all csv: 
-if True:
-    list_csv = glob.glob("csv_files/*.csv")
+        Args:
+        - df_csv (DataFrame): videos, with "Base_Path" and "Name(+Duration)" columns
+        - n_jobs (int): worker processes running pymediainfo
+        - batch_size (int): files sent to a worker at once
 
+        Returns:
+        - DataFrame: df_csv joined with the info columns
+    '''
+    from joblib import Parallel, delayed
+    files = df_csv[["Base_Path", "Name(+Duration)"]].drop_duplicates()
+    file_names = (files["Base_Path"] + files["Name(+Duration)"]).to_list()
+    infos = Parallel(n_jobs=n_jobs, batch_size=batch_size)(delayed(get_info_columns)(f, probe_cache_file) for f in file_names)
+
+    #gather as columns and join once on the file name
+    columns = {"Base_Path": files["Base_Path"].to_list(), "Name(+Duration)": files["Name(+Duration)"].to_list()}
+    for column in temp_info_keys:
+        columns[column] = [info[column] for info in infos]
+    df_csv = df_csv.drop(columns=[c for c in temp_info_keys if c in df_csv.columns])
+    return df_csv.merge(pd.DataFrame(columns), on=["Base_Path", "Name(+Duration)"], how="left")
+
+def update_csv_files(csv_glob="csv_files/*.csv", n_jobs=-1):
+    '''
+        update_csv_info on every csv file of csv_glob, saved in place
+    '''
     #check if the video is actuall HDR
-    for i in list_csv:
+    for i in glob.glob(csv_glob):
         df_temp = pd.read_csv(i)
-
-        if False:
-            file_name = df_temp["Base_Path"][0]+df_temp["Name(+Duration)"][0]
-
-            info_dict = get_info_dict(file_name)
-
-            print(info_dict["Video"]["Format"])
-            print(info_dict["Video"]["Codec ID"])
-
         #update csv and save
-        df_temp = update_csv_info(df_temp)
+        df_temp = update_csv_info(df_temp, n_jobs=n_jobs)
         df_temp.to_csv(i)
 
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_scan = subparsers.add_parser("scan", help="Probe the dataset folders and write the stats table")
+    parser_scan.add_argument("--base_path", type=str, default=base_path, help="Root of the dataset folders")
+    parser_scan.add_argument("--folders", type=str, nargs="+", default=raw_vid_folders, help="Dataset folders in base_path")
+    parser_scan.add_argument("--stats_file", type=str, default=stats_file, help="Stats table; a csv next to it without pyarrow")
+    parser_scan.add_argument("--n_jobs", type=int, default=-1, help="Number of parallel pymediainfo processes")
+
+    parser_classify = subparsers.add_parser("classify", help="Write the HDR, vertical and HDR vertical lists from the stats table")
+    parser_classify.add_argument("--stats_file", type=str, default=stats_file, help="Stats table written by scan")
+    parser_classify.add_argument("--no_excel", action="store_true", help="Only write csv files")
+
+    parser_runtime = subparsers.add_parser("runtime-stats", help="Run time statistics and histogram of a list of videos")
+    parser_runtime.add_argument("--csv_file", type=str, default="csv_files/True_HDR_Vertical_Shorts_list.csv", help="List of videos")
+    parser_runtime.add_argument("--clip_duration", type=int, default=10, help="Run time of each clip, in secs")
+    parser_runtime.add_argument("--plot_file", type=str, default="Average_Runtime_Dist.png", help="Image of the plot")
+
+    parser_batch = subparsers.add_parser("batch-export", help="Split the HDR vertical list into batches")
+    parser_batch.add_argument("--csv_file", type=str, default="True_HDR_Vertical_Shorts_list.csv", help="List of videos written by classify")
+    parser_batch.add_argument("--batch_size", type=int, default=500, help="Videos per batch")
+    parser_batch.add_argument("--no_excel", action="store_true", help="Only write csv files")
+
+    parser_info = subparsers.add_parser("info", help="Add the mediainfo columns to csv files")
+    parser_info.add_argument("--csv_glob", type=str, default="csv_files/*.csv", help="Glob pattern of the csv files")
+    parser_info.add_argument("--n_jobs", type=int, default=-1, help="Number of parallel pymediainfo processes")
+
+    args = parser.parse_args()
+    if args.command == "scan":
+        scan([args.base_path+folder for folder in args.folders], args.stats_file, n_jobs=args.n_jobs)
+    elif args.command == "classify":
+        classify(load_stats(args.stats_file), excel=not args.no_excel)
+    elif args.command == "runtime-stats":
+        runtime_stats(args.csv_file, args.clip_duration, args.plot_file)
+    elif args.command == "batch-export":
+        batch_export(args.csv_file, args.batch_size, excel=not args.no_excel)
+    elif args.command == "info":
+        update_csv_files(args.csv_glob, n_jobs=args.n_jobs)
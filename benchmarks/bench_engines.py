@@ -0,0 +1,79 @@
+"""
+    Benchmark of the per-video overhead of the download engines on locally served small files
+
+    A local http server serves --videos small mp4 files; every video is probed and downloaded one after the other by
+    the subprocess engine (a yt-dlp process per probe and per download) and by the inprocess engine (one yt_dlp.YoutubeDL).
+    The files are tiny, so the time per video is the overhead of the engine.
+
+    NOTE: needs ffmpeg to make the test clips.
+
+    Usage:
+    python benchmarks/bench_engines.py --videos 20 --kbytes 200
+
+"""
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+import functools
+import threading
+import subprocess
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from download_vimeo_urls import ENGINES, select_format
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class QuietServer(ThreadingHTTPServer):
+    # the probes close the connection before the whole file is sent
+    def handle_error(self, request, client_address):
+        pass
+
+def make_videos(folder, videos, seconds, kbytes):
+    # one clip copied under as many names
+    clip = os.path.join(folder, "v0.mp4")
+    subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc2=size=640x360:rate=30", "-t", str(seconds), "-c:v", "libx264",
+                    "-b:v", "{}k".format(kbytes * 8 // seconds), clip], check=True)
+    for k in range(1, videos):
+        os.link(clip, os.path.join(folder, "v{}.mp4".format(k)))
+    return os.path.getsize(clip)
+
+def run_engine(name, urls, save_folder):
+    # probe and download every url with one engine; returns the seconds per video
+    engine = ENGINES[name]()
+    start = time.perf_counter()
+    for k, url in enumerate(urls):
+        info = engine.probe(url)
+        returncode, errors, filepath = engine.download(url, info, select_format(info), os.path.join(save_folder, name + str(k) + ".%(ext)s"))
+        assert returncode == 0 and filepath and os.path.isfile(filepath), errors
+    return (time.perf_counter() - start) / len(urls)
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--videos", type=int, default=20, help="Number of videos per engine")
+    parser.add_argument("--seconds", type=int, default=4, help="Duration of the test clip")
+    parser.add_argument("--kbytes", type=int, default=200, help="Approximate size of the test clip")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES), help="Engines to compare")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as media, tempfile.TemporaryDirectory() as save_folder:
+        size = make_videos(media, args.videos, args.seconds, args.kbytes)
+        server = QuietServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=media))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        urls = ["http://127.0.0.1:{}/v{}.mp4".format(server.server_address[1], k) for k in range(args.videos)]
+        print("{} videos of {} KB".format(args.videos, size // 1024))
+        try:
+            for name in args.engines:
+                print("{:<10} {:.3f} s per video".format(name, run_engine(name, urls, save_folder)))
+        finally:
+            server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+    Micro-benchmark of the clip titles of VimeoSearch: the title index against the old rescan of all_results
+
+    Synthetic search pages of clips with repeated names are collected by a VimeoSearch (unique_title + collect_results)
+    and by the old query_vimeo loop, which rebuilt the list of every collected title for each "I" it appended.
+    Both must give the same titles.
+
+    NOTE: the old loop is quadratic; the default 50k clips over 10k names takes minutes.
+
+    Usage:
+    python benchmarks/bench_title_index.py --clips 50000 --names 10000
+
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vimeo_search_python.vimeo_search import VimeoSearch
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+def synthetic_pages(clips, names, page_size=18, seed=0):
+    # pages of (id, name); every id is new, the names repeat
+    rng = random.Random(seed)
+    clip_names = ["clip {}".format(rng.randrange(names)) for _ in range(clips)]
+    return [list(enumerate(clip_names))[k:k+page_size] for k in range(0, clips, page_size)]
+
+def new_titles(pages):
+    searcher = VimeoSearch()
+    for page in pages:
+        searcher.collect_results([{"url": "https://vimeo.com/{}".format(i), "title": searcher.unique_title(name)} for i, name in page])
+    return [result["title"] for result in searcher.all_results]
+
+def old_titles(pages):
+    # the loop of query_vimeo before the title index
+    all_results = []
+    for page in pages:
+        temp_results = []
+        for i, name in page:
+            title = name + " "
+            while title in [video["title"] for video in all_results]:
+                title += "I"
+            temp_results.append({"url": "https://vimeo.com/{}".format(i), "title": title})
+        all_results.extend(temp_results)
+    return [result["title"] for result in all_results]
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clips", type=int, default=50000, help="Number of synthetic clips")
+    parser.add_argument("--names", type=int, default=10000, help="Number of distinct clip names")
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.clips, args.names)
+    start = time.perf_counter()
+    titles = new_titles(pages)
+    new_time = time.perf_counter() - start
+    print("title index: {:.3f} s".format(new_time))
+
+    start = time.perf_counter()
+    expected = old_titles(pages)
+    old_time = time.perf_counter() - start
+    print("old loop:    {:.3f} s".format(old_time))
+
+    assert titles == expected, "the titles differ"
+    print("{} clips, {} names: identical titles, {:.0f}x faster".format(args.clips, args.names, old_time / new_time))
+
+if __name__ == "__main__":
+    main()
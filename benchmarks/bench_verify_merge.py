@@ -0,0 +1,99 @@
+"""
+    Benchmark of the cross-batch ID dedupe of vimeo-search_batches.verify_merge at 1M previous IDs
+
+    The keyword frames of a batch are deduped against the IDs already in the batch and the IDs of the previous csv
+    files: by verify_merge with the persistent IDIndex, and by the old row by row loop against a list of the previous
+    IDs (drop per row, df.append per keyword). Both must keep the same rows.
+
+    NOTE: the IDIndex build is timed separately; it runs once per searched_csv root, not once per batch.
+
+    Usage:
+    python benchmarks/bench_verify_merge.py --previous 1000000 --keywords 20 --rows 110
+
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+import argparse
+import importlib.util
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from id_index import IDIndex
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+def load_search_batches():
+    # vimeo-search_batches.py is not an importable module name
+    spec = importlib.util.spec_from_file_location("vimeo_search_batches", os.path.join(ROOT, "vimeo-search_batches.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def synthetic_frames(previous, keywords, rows, seed=0):
+    # keyword frames with ids repeated between keywords and ids of the previous csv files
+    rng = random.Random(seed)
+    previous_ids = [str(10**8 + i) for i in range(previous)]
+    frames = []
+    for _ in range(keywords):
+        ids = [rng.choice(previous_ids) if rng.random() < 0.2 else str(2 * 10**8 + rng.randrange(keywords * rows)) for _ in range(rows)]
+        ids = list(dict.fromkeys(ids))
+        frames.append(pd.DataFrame({"id": ids, "title": ["t"] * len(ids)}))
+    return previous_ids, frames
+
+def old_verify_merge(df_temp, df, df_prev, keyword):
+    # verify_merge before the hashed dedupe
+    for k in range(len(df_temp)):
+        if df_temp['id'][k] in df['id'].values:
+            df_temp.drop(k, inplace=True)
+        elif len(df_temp)!=0:
+            if df_temp['id'][k] in df_prev:
+                df_temp.drop(k, inplace=True)
+    return df_temp
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--previous", type=int, default=1000000, help="Number of IDs of the previous csv files")
+    parser.add_argument("--keywords", type=int, default=20, help="Number of keyword frames in the batch")
+    parser.add_argument("--rows", type=int, default=110, help="Rows per keyword frame")
+    args = parser.parse_args()
+
+    search_batches = load_search_batches()
+    previous_ids, frames = synthetic_frames(args.previous, args.keywords, args.rows)
+
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        prev_ids = IDIndex(os.path.join(folder, "id_index.sqlite"))
+        prev_ids.add(previous_ids)
+        print("IDIndex build: {:.3f} s".format(time.perf_counter() - start))
+
+        # print of the duplicate counts of verify_merge left out of the timing
+        sys.stdout = open(os.devnull, "w")
+        start = time.perf_counter()
+        batch_ids = set()
+        kept = [search_batches.verify_merge(df.copy(), batch_ids, prev_ids, "k")["id"].tolist() for df in frames]
+        new_time = time.perf_counter() - start
+        sys.stdout = sys.__stdout__
+        prev_ids.close()
+    print("verify_merge: {:.3f} s".format(new_time))
+
+    start = time.perf_counter()
+    df = pd.DataFrame({"id": []})
+    expected = []
+    for df_temp in frames:
+        df_temp = old_verify_merge(df_temp.copy(), df, previous_ids, "k")
+        expected.append(df_temp["id"].tolist())
+        df = pd.concat([df, df_temp])
+    old_time = time.perf_counter() - start
+    print("old loop:     {:.3f} s".format(old_time))
+
+    assert kept == expected, "the kept rows differ"
+    print("{} previous IDs, {} x {} rows: identical rows, {:.0f}x faster".format(args.previous, args.keywords, args.rows, old_time / new_time))
+
+if __name__ == "__main__":
+    main()
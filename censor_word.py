@@ -1,14 +1,57 @@
-''' 
-    This file is used to censor profane words from given list of words 
+'''
+    This file is used to censor profane words from given list of words
+
+    NOTE: better_profanity checks every word against its wordlist one entry at a time; here the wordlist (with all
+    its character substitutions) is compiled into a single regex, repeated words are censored once and large lists
+    are censored in batches over a process pool. The output is the same as profanity.censor(word).
 
 '''
 
+import os
 import re
-from better_profanity import profanity
+from concurrent.futures import ProcessPoolExecutor
+from better_profanity import Profanity
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+class compiled_wordset():
+    '''
+        Drop-in replacement of Profanity.CENSOR_WORDSET; `word in wordset` is a single regex match
+    '''
+    def __init__(self, censor_wordset, char_mapping):
+        self.words = [str(w) for w in censor_wordset]
+        variants = []
+        for word in self.words:
+            variants.append("".join("(?:{})".format("|".join(re.escape(c) for c in char_mapping[char])) if char in char_mapping else re.escape(char) for char in word))
+        self.pattern = re.compile("|".join(variants))
+
+    def __contains__(self, word):
+        return self.pattern.fullmatch(word) is not None
+
+    def __len__(self):
+        return len(self.words)
 
+_engine = None
+
+def get_engine():
+    '''
+        Profanity filter with the compiled wordset; built once per process
+    '''
+    global _engine
+    if _engine is None:
+        _engine = Profanity()
+        _engine.CENSOR_WORDSET = compiled_wordset(_engine.CENSOR_WORDSET, _engine.CHARS_MAPPING)
+    return _engine
+
+def censor_batch(words):
+    engine = get_engine()
+    return [engine.censor(word) for word in words]
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
 class censor_words():
-    def __init__(self, list_words):
-        self.list_words = list_words        
+    def __init__(self, list_words, n_jobs=None, batch_size=10000):
+        self.list_words = list_words
+        self.n_jobs = n_jobs or os.cpu_count()
+        self.batch_size = batch_size
 
     def censor_words(self):
         '''
@@ -16,10 +59,20 @@ class censor_words():
 
             Args:
             - list_words (list): list of words to be censored
+            - n_jobs (int): number of processes; lists shorter than batch_size are censored in this process
+            - batch_size (int): number of words sent to a process at once
 
             Returns:
-            - original_vs_cleaned (list): list of tuples of original and cleaned words 
+            - original_vs_cleaned (list): list of tuples of original and cleaned words
         '''
-        # Censoring profane words
-        cleaned_words = [profanity.censor(word) for word in self.list_words]
-        return cleaned_words
+        # Censoring profane words; each distinct word only once
+        unique_words = list(dict.fromkeys(self.list_words))
+        batches = [unique_words[i:i+self.batch_size] for i in range(0, len(unique_words), self.batch_size)]
+        if self.n_jobs > 1 and len(batches) > 1:
+            with ProcessPoolExecutor(self.n_jobs) as executor:
+                cleaned = [word for batch in executor.map(censor_batch, batches) for word in batch]
+        else:
+            cleaned = censor_batch(unique_words)
+
+        cleaned_words = dict(zip(unique_words, cleaned))
+        return [cleaned_words[word] for word in self.list_words]
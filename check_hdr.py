@@ -1,6 +1,13 @@
 """ 
     Checking the metadata of video file to verify if it is HDR or not.
 
+    NOTE: every file is probed once; the parsed ffprobe json is used both for the HDR decision and for --dump_json.
+    NOTE: the files of a folder are probed by a pool of --workers threads, each waiting on its own ffprobe process.
+    NOTE: probes are kept in a probe cache (--cache_file); unchanged files are not probed again on the next run.
+    NOTE: with --reader header (default), MP4/MOV and MKV/WebM files are decided from their container header
+    (container_hdr.py), without starting ffprobe; ffprobe is still run for other formats, for headers that leave
+    the verdict open, and for --dump_json.
+
     - Shreshth Saini, 2022
 """
 
@@ -8,19 +15,25 @@
 import subprocess
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm 
 import argparse
+
+from probe_cache import get_probe_cache
+from container_hdr import read_video_header, header_verdict
+
+VIDEO_EXTENSIONS = ['mp4', 'mkv', 'mov', 'webm', 'm4a', 'octet-stream', 'unknown_video']
 #--------------------------------------------------------------*****--------------------------------------------------------------#
 
-def is_video_hdr(video_path):
+def probe_video(video_path):
     """
-    Check if the video at the given path is HDR.
+    Run ffprobe once on the first video stream of the file.
     
     Args:
     - video_path (str): The path to the video file.
     
     Returns:
-    - bool: True if the video is HDR, False otherwise.
+    - dict: The ffprobe json of the video stream, None if it could not be decoded.
     """
     cmd = [
         "ffprobe", 
@@ -33,10 +46,22 @@ def is_video_hdr(video_path):
 
     result = subprocess.run(cmd, capture_output=True, text=True)
     try:
-        video_info = json.loads(result.stdout)
+        return json.loads(result.stdout)
     except json.JSONDecodeError:
         print(f"Failed to decode JSON: {result.stdout}")
-        
+        return None
+
+def is_hdr_stream(video_info):
+    """
+    Check if the probed video is HDR.
+    
+    Args:
+    - video_info (dict): The ffprobe json, as returned by probe_video.
+    
+    Returns:
+    - bool: True if the video is HDR, False otherwise.
+    """
+    if not video_info or not video_info.get("streams"):
         return False
     #print(video_info)
     video_stream = video_info["streams"][0]
@@ -50,49 +75,72 @@ def is_video_hdr(video_path):
 
     return False
 
+def is_video_hdr(video_path):
+    """
+    Check if the video at the given path is HDR.
+    
+    Args:
+    - video_path (str): The path to the video file.
+    
+    Returns:
+    - bool: True if the video is HDR, False otherwise.
+    """
+    return is_hdr_stream(probe_video(video_path))
+
 #--------------------------------------------------------------*****--------------------------------------------------------------#
 """ 
     Main Function
 """
-def main(path, dump_json=False, verbose=False, HDR_list=False):
+def cached_probe_video(video_path, cache_file=None):
+    """
+    probe_video through the probe cache; without a cache file the video is always probed.
+    """
+    if not cache_file:
+        return probe_video(video_path)
+    return get_probe_cache(cache_file).get(video_path, "ffprobe", probe_video)
+
+def header_probe_video(video_path, cache_file=None):
+    """
+    The stream read from the container header if it decides the HDR verdict, else cached_probe_video.
+    """
+    stream = read_video_header(video_path)
+    if header_verdict(stream) is None:
+        return cached_probe_video(video_path, cache_file)
+    return {"streams": [stream]}
+
+def main(path, dump_json=False, verbose=False, HDR_list=False, workers=None, cache_file="probe_cache.sqlite", reader="header"):
     # check if path is folder or a file 
     if os.path.isdir(path):
-        vid_list = os.listdir(path)
-        video_path = [os.path.join(path,v) for v in vid_list if v.split('.')[-1] in ['mp4', 'mkv', 'mov', 'webm', 'm4a', 'octet-stream', 'unknown_video']]
+        video_path = [entry.path for entry in os.scandir(path) if entry.name.split('.')[-1] in VIDEO_EXTENSIONS]
     else:
         video_path = [path]
     
     count = 0
     hdr_ls = []
-    for v in tqdm(video_path):
-        check_flag = is_video_hdr(v) 
+    # the json dump needs the full ffprobe metadata
+    probe = header_probe_video if reader == "header" and not dump_json else cached_probe_video
+    # probe the files in parallel; the results come back in the order of video_path
+    with ThreadPoolExecutor(workers or os.cpu_count()) as executor:
+        probes = executor.map(probe, video_path, [cache_file]*len(video_path))
+        for v, video_info in tqdm(zip(video_path, probes), total=len(video_path)):
+            check_flag = is_hdr_stream(video_info) 
         
-        if verbose:
-            print(f"Checking {v}...")
-        if check_flag:
             if verbose:
-                print(f"{v} is HDR.")
-            hdr_ls.append(v)
-            count += 1
-        else:
-            if verbose:
-                print(f"{v} is not HDR.")
-
-        if dump_json:
-            #also print all meta data of video file 
-            cmd = [
-                "ffprobe", 
-                "-v", "error", 
-                "-show_streams",
-                "-select_streams", "v:0",
-                "-print_format", "json",
-                v
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            video_info = json.loads(result.stdout)
-            #save in json file in same folder
-            with open(v.split('/')[-1].split('.')[0] + '.json', 'w') as f:
-                json.dump(video_info, f, indent=4)
+                print(f"Checking {v}...")
+            if check_flag:
+                if verbose:
+                    print(f"{v} is HDR.")
+                hdr_ls.append(v)
+                count += 1
+            else:
+                if verbose:
+                    print(f"{v} is not HDR.")
+
+            if dump_json and video_info is not None:
+                #also save all meta data of video file, from the same probe
+                #save in json file in same folder
+                with open(v.split('/')[-1].split('.')[0] + '.json', 'w') as f:
+                    json.dump(video_info, f, indent=4)
     
     print(f"Of {len(video_path)} total videos, {count} are HDR")
     if HDR_list:
@@ -111,7 +159,10 @@ if __name__ == "__main__":
     parser.add_argument("--verbose", type=bool, default=False, help='File level verbose.')
     parser.add_argument("--HDR_list", type=bool, default=False, help="returns the list of HDR videos")
     parser.add_argument("--dump_json", type=bool, default=False, help="Dump the metadata in json file for each video")
+    parser.add_argument("--workers", type=int, default=None, help="Number of parallel ffprobe processes; default is the number of cores")
+    parser.add_argument("--cache_file", type=str, default="probe_cache.sqlite", help="Probe cache; an empty string disables the cache")
+    parser.add_argument("--reader", type=str, default="header", choices=["header", "ffprobe"], help="header: read the container header, ffprobe only when needed; ffprobe: always run ffprobe")
     args = parser.parse_args()
     video_root = args.video_root
-    main(video_root, args.dump_json, verbose=args.verbose, HDR_list=args.HDR_list)
+    main(video_root, args.dump_json, verbose=args.verbose, HDR_list=args.HDR_list, workers=args.workers, cache_file=args.cache_file, reader=args.reader)
 
@@ -0,0 +1,333 @@
+'''
+    Reading the HDR metadata of a video from its container header, without starting ffprobe
+    - read_video_header(path): ffprobe like dict of the first video stream (codec_name, width, height, color_primaries,
+      color_transfer, color_space, bits_per_raw_sample), read from the MP4/MOV or MKV/WebM header; None for other formats
+    - header_verdict(stream): the verdict of check_hdr.is_hdr_stream if the header decides it, None if ffprobe is needed
+
+    NOTE: MP4/MOV: moov > trak (vide handler) > mdia > minf > stbl > stsd > sample entry, with colr (nclx/nclc) for the
+    colour description and hvcC/avcC/vpcC/av1C for the bit depth. Only box headers and the sample description are read,
+    with seeks, so a moov at the end of the file costs a few more small reads.
+    NOTE: MKV/WebM: Segment > Tracks > TrackEntry (video) > Video > Colour, and CodecPrivate for the bit depth; the
+    reader stops at the first Cluster.
+    NOTE: ffprobe takes the colour description from the bitstream when the container has none, and reports
+    bits_per_raw_sample only for some decoders (h264, hevc); the verdict is left to ffprobe in those cases.
+
+'''
+
+import io
+import os
+import struct
+
+# ISO/IEC 23091-2 code points, with the names ffprobe uses; 2 (unspecified) and unknown codes are left out
+PRIMARIES = {1: "bt709", 4: "bt470m", 5: "bt470bg", 6: "smpte170m", 7: "smpte240m", 9: "bt2020", 11: "smpte431", 12: "smpte432"}
+TRANSFERS = {1: "bt709", 4: "gamma22", 5: "gamma28", 6: "smpte170m", 7: "smpte240m", 8: "linear", 13: "iec61966-2-1",
+             14: "bt2020-10", 15: "bt2020-12", 16: "smpte2084", 18: "arib-std-b67"}
+MATRICES = {0: "gbr", 1: "bt709", 4: "fcc", 5: "bt470bg", 6: "smpte170m", 7: "smpte240m", 9: "bt2020nc", 10: "bt2020c"}
+
+# codecs whose bit depth ffprobe reports as bits_per_raw_sample
+BIT_DEPTH_CODECS = {"h264", "hevc"}
+
+MP4_CODECS = {b"avc1": "h264", b"avc3": "h264", b"hvc1": "hevc", b"hev1": "hevc", b"dvh1": "hevc", b"dvhe": "hevc",
+              b"vp09": "vp9", b"av01": "av1"}
+MKV_CODECS = {"V_MPEG4/ISO/AVC": "h264", "V_MPEGH/ISO/HEVC": "hevc", "V_VP9": "vp9", "V_VP8": "vp8", "V_AV1": "av1"}
+
+# size of the sample description read from an MP4
+MAX_HEADER_BYTES = 1 << 20
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+'''
+    Codec configuration records; each returns the bit depth, None if it is not in the record
+'''
+def hvcc_bit_depth(data):
+    if len(data) < 19:
+        return None
+    return (data[17] & 0x07) + 8
+
+def avcc_bit_depth(data):
+    if len(data) < 7:
+        return None
+    profile = data[1]
+    pos = 5
+    for count_size in (0x1F, 0xFF):
+        # sequence, then picture parameter sets
+        if pos >= len(data):
+            return None
+        count = data[pos] & count_size
+        pos += 1
+        for _ in range(count):
+            if pos + 2 > len(data):
+                return None
+            pos += 2 + struct.unpack(">H", data[pos:pos+2])[0]
+    if profile in (100, 110, 122, 144, 244):
+        # high profiles: chroma_format and the bit depths follow the parameter sets
+        if pos + 2 > len(data):
+            return None
+        return (data[pos+1] & 0x07) + 8
+    # the other profiles are 8 bit only
+    return 8
+
+def av1c_bit_depth(data):
+    if len(data) < 3:
+        return None
+    high_bitdepth, twelve_bit = data[2] & 0x40, data[2] & 0x20
+    return 12 if high_bitdepth and twelve_bit else 10 if high_bitdepth else 8
+
+def vp9_private_bit_depth(data):
+    # Matroska CodecPrivate of VP9: (id, length, value) features; id 3 is the bit depth
+    pos = 0
+    while pos + 2 <= len(data):
+        feature, length = data[pos], data[pos+1]
+        if feature == 3 and length == 1 and pos + 2 < len(data):
+            return data[pos+2]
+        pos += 2 + length
+    return None
+
+def make_stream(codec_name, width, height, primaries, transfer, matrix, bit_depth):
+    '''
+        ffprobe like stream dict; bit_depth is kept for header_verdict
+    '''
+    stream = {"codec_name": codec_name, "codec_type": "video", "width": width, "height": height, "bit_depth": bit_depth}
+    if primaries in PRIMARIES:
+        stream["color_primaries"] = PRIMARIES[primaries]
+    if transfer in TRANSFERS:
+        stream["color_transfer"] = TRANSFERS[transfer]
+    if matrix in MATRICES:
+        stream["color_space"] = MATRICES[matrix]
+    if bit_depth is not None and codec_name in BIT_DEPTH_CODECS:
+        stream["bits_per_raw_sample"] = str(bit_depth)
+    return stream
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+'''
+    MP4 / MOV
+'''
+def iter_boxes(f, start, end):
+    '''
+        Yields (type, payload start, payload end) of the boxes between start and end
+    '''
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            large = f.read(8)
+            if len(large) < 8:
+                return
+            size, header_size = struct.unpack(">Q", large)[0], 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size:
+            return
+        yield box_type, pos + header_size, min(pos + size, end)
+        pos += size
+
+def find_box(f, start, end, path):
+    '''
+        (payload start, payload end) of the first box at the given path of box types, None if it is missing
+    '''
+    for box_type, payload_start, payload_end in iter_boxes(f, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return payload_start, payload_end
+            return find_box(f, payload_start, payload_end, path[1:])
+    return None
+
+def parse_sample_entry(entry_type, entry):
+    '''
+        Stream of a visual sample entry (the payload after its box header)
+    '''
+    codec_name = MP4_CODECS.get(entry_type, entry_type.decode("latin-1").strip())
+    width, height = struct.unpack(">HH", entry[24:28]) if len(entry) >= 28 else (None, None)
+    primaries = transfer = matrix = bit_depth = None
+
+    child = io.BytesIO(entry)
+    for box_type, start, end in iter_boxes(child, 78, len(entry)):
+        data = entry[start:end]
+        if box_type == b"colr" and data[:4] in (b"nclx", b"nclc") and len(data) >= 10:
+            primaries, transfer, matrix = struct.unpack(">HHH", data[4:10])
+        elif box_type == b"hvcC":
+            bit_depth = hvcc_bit_depth(data)
+        elif box_type == b"avcC":
+            bit_depth = avcc_bit_depth(data)
+        elif box_type == b"av1C":
+            bit_depth = av1c_bit_depth(data)
+        elif box_type == b"vpcC" and len(data) >= 10 and data[0] == 1:
+            bit_depth = data[6] >> 4
+            if primaries is None:
+                primaries, transfer, matrix = data[7], data[8], data[9]
+    return make_stream(codec_name, width, height, primaries, transfer, matrix, bit_depth)
+
+def read_mp4_header(f, file_size):
+    moov = find_box(f, 0, file_size, [b"moov"])
+    if moov is None:
+        return None
+    for box_type, start, end in iter_boxes(f, *moov):
+        if box_type != b"trak":
+            continue
+        hdlr = find_box(f, start, end, [b"mdia", b"hdlr"])
+        if hdlr is None:
+            continue
+        f.seek(hdlr[0] + 8)
+        if f.read(4) != b"vide":
+            continue
+        stsd = find_box(f, start, end, [b"mdia", b"minf", b"stbl", b"stsd"])
+        if stsd is None:
+            return None
+        f.seek(stsd[0])
+        data = f.read(min(stsd[1] - stsd[0], MAX_HEADER_BYTES))
+        # full box header and entry count, then the first sample entry
+        if len(data) < 16:
+            return None
+        entry_size, entry_type = struct.unpack(">I4s", data[8:16])
+        return parse_sample_entry(entry_type, data[16:8+entry_size])
+    return None
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+'''
+    Matroska / WebM
+'''
+EBML_HEADER, SEGMENT, TRACKS, CLUSTER = 0x1A45DFA3, 0x18538067, 0x1654AE6B, 0x1F43B675
+TRACK_ENTRY, TRACK_TYPE, CODEC_ID, CODEC_PRIVATE, VIDEO = 0xAE, 0x83, 0x86, 0x63A2, 0xE0
+PIXEL_WIDTH, PIXEL_HEIGHT, COLOUR = 0xB0, 0xBA, 0x55B0
+MATRIX_COEFFICIENTS, BITS_PER_CHANNEL, TRANSFER_CHARACTERISTICS, PRIMARIES_ID = 0x55B1, 0x55B2, 0x55BA, 0x55BB
+
+def read_vint(f, keep_marker):
+    '''
+        EBML variable length integer; element IDs keep their marker bit. Returns (value, unknown size)
+    '''
+    first = f.read(1)
+    if not first:
+        raise EOFError
+    length = 1
+    while length <= 8 and not first[0] & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8:
+        raise ValueError("invalid EBML integer")
+    value = first[0] if keep_marker else first[0] & (0xFF >> length)
+    rest = f.read(length - 1)
+    if len(rest) < length - 1:
+        raise EOFError
+    for b in rest:
+        value = (value << 8) | b
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, unknown
+
+def iter_elements(f, end):
+    '''
+        Yields (id, size, data start) of the elements up to end; size is None for an unknown size
+    '''
+    while f.tell() < end:
+        element_id, _ = read_vint(f, True)
+        size, unknown = read_vint(f, False)
+        start = f.tell()
+        yield element_id, None if unknown else size, start
+        if unknown:
+            return
+        f.seek(start + size)
+
+def read_uint(data):
+    return int.from_bytes(data, "big") if data else 0
+
+def parse_track_entry(data):
+    '''
+        Stream of a video TrackEntry, None for the other tracks
+    '''
+    f = io.BytesIO(data)
+    fields = {}
+    for element_id, size, start in iter_elements(f, len(data)):
+        if size is None:
+            return None
+        fields[element_id] = data[start:start+size]
+    if read_uint(fields.get(TRACK_TYPE)) != 1:
+        return None
+
+    codec_name = MKV_CODECS.get(fields.get(CODEC_ID, b"").decode("latin-1").rstrip("\0"), "unknown")
+    private = fields.get(CODEC_PRIVATE, b"")
+    bit_depth = {"hevc": hvcc_bit_depth, "h264": avcc_bit_depth, "av1": av1c_bit_depth, "vp9": vp9_private_bit_depth}.get(codec_name, lambda d: None)(private)
+
+    video = fields.get(VIDEO, b"")
+    video_fields, colour = {}, {}
+    f = io.BytesIO(video)
+    for element_id, size, start in iter_elements(f, len(video)):
+        video_fields[element_id] = video[start:start+(size or 0)]
+    colour_data = video_fields.get(COLOUR, b"")
+    f = io.BytesIO(colour_data)
+    for element_id, size, start in iter_elements(f, len(colour_data)):
+        colour[element_id] = read_uint(colour_data[start:start+(size or 0)])
+    if bit_depth is None and colour.get(BITS_PER_CHANNEL):
+        bit_depth = colour[BITS_PER_CHANNEL]
+
+    return make_stream(codec_name, read_uint(video_fields.get(PIXEL_WIDTH)) or None, read_uint(video_fields.get(PIXEL_HEIGHT)) or None,
+                       colour.get(PRIMARIES_ID), colour.get(TRANSFER_CHARACTERISTICS), colour.get(MATRIX_COEFFICIENTS), bit_depth)
+
+def read_mkv_header(f, file_size):
+    element_id, size, start = next(iter_elements(f, file_size))
+    if element_id != EBML_HEADER:
+        return None
+    f.seek(start + size)
+    element_id, size, start = next(iter_elements(f, file_size))
+    if element_id != SEGMENT:
+        return None
+    segment_end = file_size if size is None else min(file_size, start + size)
+    for element_id, size, start in iter_elements(f, segment_end):
+        if element_id == CLUSTER or size is None:
+            return None
+        if element_id == TRACKS:
+            data = f.read(min(size, MAX_HEADER_BYTES))
+            tracks = io.BytesIO(data)
+            for track_id, track_size, track_start in iter_elements(tracks, len(data)):
+                if track_id == TRACK_ENTRY and track_size is not None:
+                    stream = parse_track_entry(data[track_start:track_start+track_size])
+                    if stream is not None:
+                        return stream
+            return None
+    return None
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+def read_video_header(path):
+    '''
+        Reads the first video stream of an MP4/MOV or MKV/WebM file from its header
+
+        Args:
+        - path (str): The path to the video file
+
+        Returns:
+        - dict: ffprobe like stream, None if the format is not supported or the header could not be parsed
+    '''
+    with open(path, "rb") as f:
+        file_size = os.fstat(f.fileno()).st_size
+        magic = f.read(12)
+        f.seek(0)
+        try:
+            if magic[:4] == b"\x1a\x45\xdf\xa3":
+                return read_mkv_header(f, file_size)
+            if magic[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip"):
+                return read_mp4_header(f, file_size)
+        except (EOFError, ValueError, struct.error, StopIteration):
+            return None
+    return None
+
+def header_verdict(stream):
+    '''
+        HDR verdict of check_hdr.is_hdr_stream for a stream read from the header
+
+        Returns:
+        - bool: the verdict, None if ffprobe could decide differently from what the header shows
+    '''
+    if stream is None:
+        return None
+    if stream.get("color_transfer") == "smpte2084" or stream.get("color_space") in ["bt2020nc", "bt2020c"]:
+        return True
+    bit_depth = stream.get("bit_depth")
+    if bit_depth is None:
+        return None
+    if bit_depth > 8:
+        return True if stream["codec_name"] in BIT_DEPTH_CODECS else None
+    # without a colour description in the container, ffprobe reads it from the bitstream
+    if "color_transfer" not in stream or "color_space" not in stream:
+        return None
+    return False
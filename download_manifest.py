@@ -0,0 +1,99 @@
+'''
+    Persistent manifest of the downloaded videos, keyed by video ID
+    - DownloadManifest(path): SQLite table of (id, status, path, size, checksum, updated)
+    - `id in manifest`: True if the video is downloaded
+    - DownloadManifest.mark(id, status, path): record the outcome of a download in one transaction
+    - DownloadManifest.bootstrap(save_folder): record the files already in the save folder; only needed once
+    - DownloadManifest.is_complete(): True once a bootstrap has finished; an interrupted bootstrap leaves the manifest incomplete
+    - is_partial_file(name): True for the partial download files of yt-dlp and aria2c
+
+    NOTE: each process (or thread) opens its own connection with get_manifest(path); SQLite serialises the writers.
+
+'''
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+def file_checksum(path, chunk_size=1 << 20):
+    '''
+        sha256 of the file, read in chunks
+    '''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def is_partial_file(name):
+    # .part (and .part-FragN) data, .ytdl fragment state and .aria2 control files of unfinished downloads
+    return name.endswith(('.part', '.ytdl', '.aria2')) or '.part-Frag' in name
+
+class DownloadManifest():
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS downloads (id TEXT PRIMARY KEY, status TEXT, path TEXT, size INTEGER, checksum TEXT, updated REAL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+
+    def __contains__(self, id):
+        return self.status(id) == 'done'
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM downloads WHERE status = 'done'").fetchone()[0]
+
+    def status(self, id):
+        row = self.conn.execute("SELECT status FROM downloads WHERE id = ?", (str(id),)).fetchone()
+        return row[0] if row else None
+
+    def mark(self, id, status, path=None, checksum=False):
+        '''
+            Record the outcome of a download
+
+            Args:
+            - id (str): video ID
+            - status (str): 'done' or 'failed'
+            - path (str): downloaded file; its size (and checksum) are recorded
+            - checksum (bool): compute the sha256 of the file
+        '''
+        size = os.path.getsize(path) if path else None
+        digest = file_checksum(path) if path and checksum else None
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO downloads (id, status, path, size, checksum, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                              (str(id), status, path, size, digest, time.time()))
+
+    def is_complete(self):
+        return self.conn.execute("SELECT 1 FROM meta WHERE key = 'complete'").fetchone() is not None
+
+    def bootstrap(self, save_folder):
+        '''
+            Record the videos already in the save folder (named id_duration.ext); partial downloads are skipped
+        '''
+        rows = []
+        for entry in os.scandir(save_folder):
+            if not entry.is_file() or is_partial_file(entry.name) or entry.name.startswith('manifest.sqlite'):
+                continue
+            rows.append((entry.name.split('_')[0], 'done', entry.path, entry.stat().st_size, None, time.time()))
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO downloads (id, status, path, size, checksum, updated) VALUES (?, ?, ?, ?, ?, ?)", rows)
+            # the manifest is complete only once every file of the folder is in it
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('complete', '1')")
+
+    def close(self):
+        self.conn.close()
+
+_manifests = {}
+
+def get_manifest(path):
+    '''
+        Manifest connection of the current process (or thread); opened on first use
+    '''
+    key = (path, threading.get_ident())
+    if key not in _manifests:
+        _manifests[key] = DownloadManifest(path)
+    return _manifests[key]
@@ -1,123 +1,544 @@
 import os 
+import json
+import tempfile
 import subprocess
 import pandas as pd 
 import numpy as np
 from tqdm import tqdm
 from joblib import Parallel, delayed
-from glob import glob
 import argparse
+import asyncio
+import time
+import threading
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from download_manifest import DownloadManifest, get_manifest, is_partial_file
+from vimeo_search_python.retry_policy import RetryPolicy, RETRY
 
 #--------------------------------------------------------------*****--------------------------------------------------------------#
 """ 
     Obtaining the key for the highest video quality for the given url 
+    NOTE: the url is probed once with yt-dlp -J; the same info json is given to the download with --load-info-json, so the page is extracted only once per video.
+    NOTE: the format urls of the info json are signed and expire; a transfer starting more than PROBE_TTL seconds after the probe (info 'epoch') probes again.
 
 """
 
-def get_best_mp4_format(url): # sometimes MP4 does not contain any metadata 
-    command = ["yt-dlp", "-F", url]
+def probe_video(url):
+    command = ["yt-dlp", "-J", url]
     result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-    
+
     if result.returncode != 0:
         print(f"Failed to get formats: {result.stderr}")
         return None
 
-    best_format = None
-    for line in result.stdout.split("\n"):
-        if line.strip():
-            if "mp4" in line:
-                best_format = line.split()[0]
-    
-    return best_format
+    try:
+        return json.loads(result.stdout)
+    except json.JSONDecodeError:
+        print(f"Failed to decode info json: {url}")
+        return None
 
-def get_best_format(url):
-    command = ["yt-dlp", "-F", url]
-    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-    
-    if result.returncode != 0:
-        print(f"Failed to get formats: {result.stderr}")
+def select_format(info, format_vid='any'):
+    '''
+        Best video format of the info json: HDR first, then the height, then the bitrate; ties keep yt-dlp's order (worst to best)
+        NOTE: format_vid 'MP4' only selects mp4 formats; sometimes MP4 does not contain any metadata
+    '''
+    formats = info.get('formats') or [info]
+    if format_vid == 'MP4':
+        formats = [f for f in formats if f.get('ext') == 'mp4']
+    # skip audio only formats when there is any video format
+    formats = [f for f in formats if f.get('vcodec') != 'none'] or formats
+    if len(formats) == 0:
         return None
 
-    best_format = None
-    for line in result.stdout.split("\n"):
-        if line.strip():
-            best_format = line.split()[0]
-    return best_format
+    def rank(k):
+        f = formats[k]
+        return (f.get('dynamic_range') not in (None, 'SDR'), f.get('height') or 0, f.get('tbr') or 0, k)
+
+    return formats[max(range(len(formats)), key=rank)].get('format_id')
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+""" 
+    Download engines: probe(url) returns the info json, download(url, info, format, file_name, rate_limit, fragments, downloader) returns (return code, error lines, output file)
+    NOTE: the output file is the path yt-dlp reports after the download (None if it did not finish), so the save folder is never listed per video.
+    - subprocess: a yt-dlp process per probe and per download
+    - inprocess: one long-lived yt_dlp.YoutubeDL per worker process; no interpreter start-up or extractor import per video
+    NOTE: fragments are fetched concurrently (yt-dlp -N) and unfinished .part files are always continued; yt-dlp resumes
+    with a Range request and starts over when the server does not answer with the requested range.
+    NOTE: downloader="aria2c" hands the transfer to aria2c, which splits single-file downloads into parallel segments.
+    NOTE: a missing fragment aborts the download (yt-dlp skips it by default, reporting it only on the screen), so a video
+    with a hole is never moved into place; the skip message is still captured should a fragment be skipped.
+"""
+
+# seconds an info json is used for a download; older ones are probed again, their format urls may have expired
+PROBE_TTL = 900
+
+# output of yt-dlp for a missing fragment: skipped (to_screen) or aborted (error)
+FRAGMENT_ERRORS = ("Skipping fragment", "not found, unable to continue")
+
+# arguments of the external downloaders; aria2c: 16 connections, 1M segments
+EXTERNAL_DOWNLOADER_ARGS = {"aria2c": ["-x", "16", "-s", "16", "-k", "1M"]}
+
+class SubprocessEngine():
+    def probe(self, url):
+        return probe_video(url)
+
+    def download(self, url, info, format, file_name, rate_limit=None, fragments=1, downloader=None):
+        # Downloads load the probed info json instead of extracting the url again
+        info_json = None
+        source = [url]
+        if info is not None:
+            with tempfile.NamedTemporaryFile('w', suffix='.info.json', delete=False) as f:
+                json.dump(info, f)
+            info_json = f.name
+            source = ["--load-info-json", info_json]
+
+        command = ["yt-dlp", "--continue", "--abort-on-unavailable-fragments", "-N", str(fragments)] + (["-f", str(format)] if format is not None else []) + (["--limit-rate", str(int(rate_limit))] if rate_limit else [])
+        if downloader:
+            command += ["--downloader", downloader, "--downloader-args", downloader + ":" + " ".join(EXTERNAL_DOWNLOADER_ARGS.get(downloader, []))]
+        # the final path is printed on stdout once the file is in place
+        command += ["--print", "after_move:filepath", "--no-simulate"] + source + ["-o", file_name]
+        try:
+            process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        finally:
+            if info_json is not None:
+                os.remove(info_json)
+        printed = process.stdout.strip().splitlines()
+        return process.returncode, process.stderr.splitlines(), printed[-1] if printed else None
+
+class InProcessEngine():
+    def __init__(self):
+        import yt_dlp
+        self.yt_dlp = yt_dlp
+        self.errors = []
+        self.progress = {}
+        self.filepath = None
+        self.ydl = yt_dlp.YoutubeDL({
+            "quiet": True,
+            "no_warnings": True,
+            "noprogress": True,
+            "logger": self,
+            "progress_hooks": [self.progress_hook],
+            "post_hooks": [self.post_hook],
+        })
+
+    # logger interface of YoutubeDL; warnings and errors are kept like the stderr lines of the subprocess engine
+    def debug(self, msg):
+        # to_screen lines arrive here; only a skipped fragment matters
+        if any(message in msg for message in FRAGMENT_ERRORS):
+            self.errors.append(msg)
+
+    def info(self, msg):
+        pass
+
+    def warning(self, msg):
+        self.errors.append(msg)
+
+    def error(self, msg):
+        self.errors.append(msg)
+
+    def progress_hook(self, d):
+        self.progress = {"status": d.get("status"), "filename": d.get("filename"), "downloaded_bytes": d.get("downloaded_bytes")}
+
+    # final path of the video, after the postprocessors
+    def post_hook(self, filename):
+        self.filepath = filename
+
+    def probe(self, url):
+        self.ydl.format_selector = None
+        try:
+            return self.ydl.sanitize_info(self.ydl.extract_info(url, download=False))
+        except self.yt_dlp.utils.DownloadError as e:
+            print(f"Failed to get formats: {e}")
+            return None
+
+    def download(self, url, info, format, file_name, rate_limit=None, fragments=1, downloader=None):
+        self.errors = []
+        self.progress = {}
+        self.filepath = None
+        # format and output file are per video; None selects yt-dlp's default format
+        self.ydl.format_selector = self.ydl.build_format_selector(str(format)) if format is not None else None
+        self.ydl.params['outtmpl']['default'] = file_name
+        self.ydl.params['ratelimit'] = rate_limit
+        self.ydl.params['continuedl'] = True
+        self.ydl.params['skip_unavailable_fragments'] = False
+        self.ydl.params['concurrent_fragment_downloads'] = fragments
+        self.ydl.params['external_downloader'] = {'default': downloader} if downloader else {}
+        self.ydl.params['external_downloader_args'] = {downloader: EXTERNAL_DOWNLOADER_ARGS.get(downloader, [])} if downloader else {}
+        try:
+            if info is not None:
+                self.ydl.process_ie_result(dict(info), download=True)
+            else:
+                self.ydl.extract_info(url, download=True)
+        except self.yt_dlp.utils.DownloadError:
+            return 1, self.errors, None
+        except Exception as e:
+            # an aborted fragment download can make the other fragment threads fail with a plain exception
+            self.errors.append(f"{type(e).__name__}: {e}")
+            return 1, self.errors, None
+        return 0, self.errors, self.filepath
+
+ENGINES = {"subprocess": SubprocessEngine, "inprocess": InProcessEngine}
+_engines = {}
+
+def get_engine(name):
+    '''
+        Engine of the current worker process (or thread); created on first use and reused for every video
+    '''
+    key = (name, threading.get_ident())
+    if key not in _engines:
+        _engines[key] = ENGINES[name]()
+    return _engines[key]
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+""" 
+    Streaming task source: the csv file is read in chunks (url and play_time columns only) and every video becomes a
+    small task record, so memory stays flat whatever the size of the csv file.
+"""
+# One video to download; manifest is the path of the download manifest
+DownloadTask = namedtuple('DownloadTask', ['save_folder', 'id', 'duration', 'url', 'manifest', 'format_vid', 'engine', 'concurrent_fragments', 'downloader'],
+                          defaults=[1, None])
+
+def iter_videos(csv_file, chunksize=10000):
+    '''
+        Yields (id, url, duration) of every row of the csv file
+    '''
+    for chunk in pd.read_csv(csv_file, usecols=['url', 'play_time'], dtype=str, chunksize=chunksize):
+        for url, play_time in zip(chunk['url'].values, chunk['play_time'].values):
+            yield url.split('/')[-1], url, str(play_time)
 
 #--------------------------------------------------------------*****--------------------------------------------------------------#
 """ 
     Core function to download the video from the url and save it in the folder
 """
-def download_video(save_folder, d, duration, urls, files, i, format_vid='any'):
-    
-    # save the video in the folder with id_duration
-    file_name = save_folder + d + "_" + str(duration[i]) + ".%(ext)s"
-    
+def download_video(task):
+    '''
+        Returns the status of the video (a DownloadTask): 'exists', 'downloaded' or 'failed'
+    '''
+    probed = probe_task(task)
+    if probed is None:
+        return 'exists'
+    info, format = probed
+    return transfer_task(task, info, format)
+
+def probe_task(task):
+    '''
+        Probe stage of download_video; returns None if the video is already downloaded else (info json, format)
+        NOTE: every worker opens its own connection to the manifest
+    '''
     # If file already exists, skip
-    if d in files:
-        print("File already exists: ",d)
+    if task.id in get_manifest(task.manifest):
+        print("File already exists: ",task.id)
+        return None
+
+    # Probe the url once and select the best format from the info json
+    info = get_engine(task.engine).probe(task.url)
+    format = select_format(info, task.format_vid) if info is not None else None
+    return info, format
+
+def partial_files(save_folder, d, duration, info, format):
+    '''
+        Known paths of a download of the format: id_duration.ext with its .part, .ytdl and aria2c control files
+        NOTE: the names follow from the ext of the probed format, so the save folder is never listed per video
+    '''
+    if info is None:
+        return []
+    exts = [f.get('ext') for f in info.get('formats') or [info] if f.get('format_id') == format] if format is not None else [info.get('ext')]
+    base = save_folder + d + "_" + duration + "."
+    return [base + ext + suffix for ext in exts if ext for suffix in ("", ".part", ".ytdl", ".part.aria2")]
+
+def drop_stale_parts(save_folder, d, duration, info, format):
+    '''
+        Remove the .part file of a video that is larger than the probed size of the format; it cannot be continued
+    '''
+    sizes = [f.get('filesize') for f in (info or {}).get('formats') or [] if f.get('format_id') == format]
+    if not sizes or not sizes[0]:
         return
+    for filepath in partial_files(save_folder, d, duration, info, format):
+        if not filepath.endswith(".part"):
+            continue
+        try:
+            stale = os.stat(filepath).st_size > sizes[0]
+        except FileNotFoundError:
+            continue
+        if stale:
+            print("Removing stale partial download: ", filepath)
+            os.remove(filepath)
 
-    # Download format options from the url from function: avoid MP4 format as it does not contain any metadata
-    if format_vid == 'MP4':
-        format = get_best_mp4_format(urls[i])
-    else: 
-        format = get_best_format(urls[i])
-
-    command = [
-        "yt-dlp",
-        "-f",
-        str(format),
-        urls[i],
-        "-o",
-        file_name
-    ]
-    
-    # Print the processed id 
-    #print("Processing: ",d)
-    # Try to download the video or raise error
-    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-    #os.system("yt-dlp -f \"bv\"  \"" + urls[i] + "\" -o \"" + file_name + "\"")
-
-    error_occurred = False 
-    for output_line in process.stderr.splitlines():
-        print(output_line)  # Print the output line to the console
-        if "fragment not found" in output_line:
-            print("Fragment not found, aborting download...")
-            # Here, since the process has already completed, you can't "abort" it as it's already done.
-            error_occured = True
-            break
-
-    if error_occurred:
-        for filepath in glob(save_folder + d + "_" + duration[i] + "*.*"):
-            try:
-                os.remove(filepath)  
-                print("Downloaded file removed.")
-            except FileNotFoundError:
-                print("No file found to remove.")
+_policies = {}
+
+def get_retry_policy():
+    '''
+        Retry policy of the current worker process; its circuit breakers are shared by the threads of the process
+    '''
+    key = os.getpid()
+    if key not in _policies:
+        _policies[key] = RetryPolicy()
+    return _policies[key]
+
+def transfer_task(task, info, format, rate_limit=None):
+    '''
+        Transfer stage of download_video; downloads the probed format and falls back to auto format selection
+        NOTE: an info json older than PROBE_TTL is probed again; the auto format fallback always extracts the url again
+        NOTE: transient errors (429, 5xx, timeouts, missing fragments) are retried with the retry policy; when the
+        circuit breaker of the host is open the video fails at once and is retried on the next run
+        Returns 'downloaded' or 'failed'
+    '''
+    save_folder, d, duration, url, manifest = task.save_folder, task.id, task.duration, task.url, task.manifest
+    # save the video in the folder with id_duration
+    file_name = save_folder + d + "_" + duration + ".%(ext)s"
+    downloader = get_engine(task.engine)
+    options = dict(fragments=task.concurrent_fragments, downloader=task.downloader)
+    policy = get_retry_policy()
+    # yt-dlp applies the rate limit to each of the concurrent fragments, aria2c to the whole download
+    if rate_limit and task.downloader is None:
+        rate_limit = rate_limit / max(task.concurrent_fragments, 1)
+
+    # the signed format urls of a stale info json may have expired
+    if info is not None and time.time() - info.get('epoch', 0) > PROBE_TTL:
+        info = downloader.probe(url)
+        format = select_format(info, task.format_vid) if info is not None else None
+
+    # path of the downloaded file, as reported by the engine
+    filepath = None
+
+    # Download the format; returns the return code, or None if the host is not tried because of its circuit breaker
+    def attempt(fmt, info):
+        nonlocal filepath
+        host = format_host(info, fmt, url)
+        returncode = None
+        for retry in range(policy.max_retries + 1):
+            if policy.wait_time(host) > 0:
+                print(f"Too many failures for {host}, skipping: ", d)
+                return None
+            returncode, errors, filepath = downloader.download(url, info, fmt, file_name, rate_limit, **options)
+
+            error_occurred = False 
+            for output_line in errors:
+                print(output_line)  # Print the output line to the console
+                if any(message in output_line for message in FRAGMENT_ERRORS):
+                    print("Fragment not found, aborting download...")
+                    error_occurred = True
+                    break
+
+            # a video with missing fragments is broken even if yt-dlp succeeded
+            if error_occurred:
+                partials = partial_files(save_folder, d, duration, info, fmt) + ([filepath] if filepath else [])
+                for partial in dict.fromkeys(partials):
+                    try:
+                        os.remove(partial)  
+                        print("Downloaded file removed.")
+                    except FileNotFoundError:
+                        pass
+                returncode = returncode or 1
 
-    if process.returncode == 0:
+            if returncode == 0:
+                policy.record_success(host)
+                return returncode
+            if policy.classify(errors=errors) != RETRY:
+                return returncode
+            policy.record_failure(host)
+            if retry < policy.max_retries:
+                delay = policy.delay(retry)
+                print(f"Transient error, retrying in {delay:.1f}s ({retry+1}/{policy.max_retries}): ", d)
+                time.sleep(delay)
+        return returncode
+
+    returncode = None
+    if format is not None:
+        drop_stale_parts(save_folder, d, duration, info, format)
+        # Print the processed id 
+        #print("Processing: ",d)
+        # Try to download the video or raise error
+        returncode = attempt(format, info)
+
+    if returncode == 0:
         pass #print("Downloaded: ",d)
-    else:
-        print(f"Download failed: {process.returncode}")
+    elif policy.wait_time(format_host(info, None, url)) == 0:
+        if returncode is not None:
+            print(f"Download failed: {returncode}")
         print("Retrying with auto format selection.......")
-        # retry download with auto format selection with best quality
-        command = [
-            "yt-dlp",
-            urls[i],
-            "-o",
-            file_name
-        ]
-        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-
-        if process.returncode == 0:
+        # retry download with auto format selection with best quality; the url is extracted again
+        returncode = attempt(None, None)
+
+        if returncode == 0:
             print("Downloaded with auto quality selection: ",d)
         else:
-            print("Even with auto quality selection, download failed: ", process.returncode)
-            print("Error occured: ",urls[i])   
+            print("Even with auto quality selection, download failed: ", returncode)
+            print("Error occured: ",url)   
             print(format)
 
-    return 
+    # Record the download in the manifest
+    if returncode == 0 and filepath and os.path.isfile(filepath):
+        get_manifest(manifest).mark(d, 'done', filepath, checksum=True)
+        return 'downloaded'
+    get_manifest(manifest).mark(d, 'failed')
+    return 'failed'
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+""" 
+    Pipelined scheduler: a wide probe stage (latency bound) feeds a bounded queue read by a separately sized transfer stage (bandwidth bound)
+    NOTE: both stages run the blocking probe_task/transfer_task in thread pools; each thread has its own engine.
+    NOTE: max_bandwidth is split evenly over the transfer slots; yt-dlp limits every concurrent fragment on its own, so the
+    share of a transfer is divided again by its concurrent_fragments (aria2c limits the whole transfer).
+    NOTE: per_host limits the transfers running against one host at the same time (the host of the selected format) and
+    probe_per_host the probes; each stage has its own slots, so the probes of vimeo.com can use the whole probe stage.
+    NOTE: a probe or transfer that raises fails only its video (marked failed in the manifest); the stages keep draining the queue.
+"""
+def parse_rate(rate):
+    '''
+        Parse a rate like 50M or 500K (bytes per second, 1024 based like yt-dlp); None or 0 for no limit
+    '''
+    if not rate:
+        return None
+    units = {'K': 1024, 'M': 1024**2, 'G': 1024**3}
+    rate = str(rate).strip().upper()
+    if rate[-1] in units:
+        return float(rate[:-1]) * units[rate[-1]]
+    return float(rate)
+
+def format_host(info, format, url):
+    for f in (info or {}).get('formats') or []:
+        if f.get('format_id') == format and f.get('url'):
+            return urlsplit(f['url']).netloc
+    return urlsplit(url).netloc
+
+async def run_pipeline(tasks, probe_jobs=32, transfer_jobs=4, queue_size=64, per_host=8, max_bandwidth=None, callback=None, total=None, probe_per_host=None):
+    '''
+        Download all tasks with separate probe and transfer stages
+
+        Args:
+        - tasks (iterable): DownloadTask of each video; consumed lazily
+        - probe_jobs (int): number of concurrent probes
+        - transfer_jobs (int): number of concurrent transfers
+        - queue_size (int): number of probed videos waiting for a transfer slot
+        - per_host (int): maximum concurrent transfers per host
+        - max_bandwidth (str): global bandwidth cap, e.g. 50M; None for no cap
+        - callback (function): called with (task, status) when a video is done; status as returned by download_video
+        - total (int): number of tasks for the progress bar, if known
+        - probe_per_host (int): maximum concurrent probes per host; None for probe_jobs
+    '''
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(queue_size)
+    probe_slots = defaultdict(lambda: asyncio.Semaphore(probe_per_host or probe_jobs))
+    transfer_slots = defaultdict(lambda: asyncio.Semaphore(per_host))
+    bandwidth = parse_rate(max_bandwidth)
+    rate_limit = bandwidth / transfer_jobs if bandwidth else None
+    progress = tqdm(total=total)
+    pending = iter(tasks)
+
+    def done(task, status):
+        progress.update()
+        if callback is not None:
+            callback(task, status)
+
+    # an exception of a stage fails the video only; a dead transferrer would leave the probers blocked on the full queue
+    def failed(task, stage, error):
+        print(f"{stage} raised {error!r}: ", task.id)
+        get_manifest(task.manifest).mark(task.id, 'failed')
+        done(task, 'failed')
+
+    async def prober(pool):
+        for task in pending:
+            try:
+                async with probe_slots[urlsplit(task.url).netloc]:
+                    probed = await loop.run_in_executor(pool, probe_task, task)
+            except Exception as e:
+                failed(task, 'Probe', e)
+                continue
+            if probed is None:
+                done(task, 'exists')
+                continue
+            await queue.put((task, probed))
+
+    async def transferrer(pool):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            task, (info, format) = item
+            try:
+                async with transfer_slots[format_host(info, format, task.url)]:
+                    status = await loop.run_in_executor(pool, transfer_task, task, info, format, rate_limit)
+            except Exception as e:
+                failed(task, 'Transfer', e)
+                continue
+            done(task, status)
+
+    with ThreadPoolExecutor(probe_jobs) as probe_pool, ThreadPoolExecutor(transfer_jobs) as transfer_pool:
+        transferrers = [asyncio.create_task(transferrer(transfer_pool)) for _ in range(transfer_jobs)]
+        await asyncio.gather(*[prober(probe_pool) for _ in range(probe_jobs)])
+        for _ in transferrers:
+            await queue.put(None)
+        await asyncio.gather(*transferrers)
+    progress.close()
+
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+def prepare_save_folder(save_folder):
+    '''
+        Create the save folder and its download manifest; returns the manifest path
+        NOTE: the save folder is listed only until a bootstrap of the manifest has completed
+    '''
+    # create the save folder if it does not exist
+    if not os.path.exists(save_folder):
+        os.mkdir(save_folder)
+
+    manifest = save_folder + 'manifest.sqlite'
+    downloads = DownloadManifest(manifest)
+    if not downloads.is_complete():
+        downloads.bootstrap(save_folder)
+    print("Total files already present: ", len(downloads))
+    downloads.close()
+    return manifest
+
+def clean_save_folder(save_folder, manifest):
+    '''
+        Remove the orphaned partial files; unfinished downloads are kept so the next run continues them
+        - partial files of a video that is already downloaded
+        - .ytdl fragment state without its .part file, and .aria2 control files without their data file
+    '''
+    names = set(os.listdir(save_folder))
+    downloads = DownloadManifest(manifest)
+    for i in names:
+        if not is_partial_file(i):
+            continue
+        orphaned = i.split('_')[0] in downloads \
+            or (i.endswith('.ytdl') and i[:-len('.ytdl')] + '.part' not in names) \
+            or (i.endswith('.aria2') and i[:-len('.aria2')] not in names)
+        if orphaned:
+            os.remove(save_folder+i)
+    downloads.close()
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+""" 
+    Command line of the downloads, shared by download_vimeo_urls.py and multiple_csv_running.py
+"""
+def add_download_arguments(parser):
+    '''
+        Add the download options (everything but the csv source) to an argparse parser
+    '''
+    parser.add_argument('--save_folder', type=str, default= "./Downloaded_videos/", help='Path to the folder to save the videos')
+    parser.add_argument('--format', type=str, default= "any", help='Format of the video to download')
+    parser.add_argument('--n_jobs', type=int, default= 10, help='Number of parallel jobs')
+    parser.add_argument('--engine', type=str, default= "subprocess", choices=list(ENGINES), help='subprocess: yt-dlp process per video; inprocess: one yt_dlp.YoutubeDL per worker')
+    parser.add_argument('--scheduler', type=str, default= "joblib", choices=["joblib", "pipeline"], help='joblib: n_jobs workers probe and download; pipeline: separate probe and transfer stages')
+    parser.add_argument('--probe_jobs', type=int, default= 32, help='pipeline: number of concurrent probes')
+    parser.add_argument('--transfer_jobs', type=int, default= 4, help='pipeline: number of concurrent transfers')
+    parser.add_argument('--per_host', type=int, default= 8, help='pipeline: maximum concurrent transfers per host')
+    parser.add_argument('--probe_per_host', type=int, default= None, help='pipeline: maximum concurrent probes per host; defaults to probe_jobs')
+    parser.add_argument('--max_bandwidth', type=str, default= None, help='pipeline: global bandwidth cap, e.g. 50M; split over transfer_jobs and concurrent_fragments')
+    parser.add_argument('--chunksize', type=int, default= 10000, help='Number of csv rows read at once')
+    parser.add_argument('--concurrent_fragments', type=int, default= 4, help='Number of fragments of a video downloaded at once (yt-dlp -N)')
+    parser.add_argument('--downloader', type=str, default= None, choices=list(EXTERNAL_DOWNLOADER_ARGS), help='External downloader; aria2c downloads single files in parallel segments')
 
+def tasks_from_args(args, videos, manifest):
+    '''
+        Yields the DownloadTask of every (id, url, duration) of videos, with the download options of the parsed args
+    '''
+    for d, url, duration in videos:
+        yield DownloadTask(args.save_folder, d, duration, url, manifest, args.format, args.engine, args.concurrent_fragments, args.downloader)
 
 #--------------------------------------------------------------*****--------------------------------------------------------------#
 """ 
@@ -126,48 +547,19 @@ def download_video(save_folder, d, duration, urls, files, i, format_vid='any'):
 def main():
     parser = argparse.ArgumentParser(description='Download YouTube videos') 
     parser.add_argument('--csv_file', type=str, help='Path to the CSV file') # /home/ss223464/Desktop/LIVE/SantaFe/Data_Scrapping/searched_csv/CC_HDR_4K__10k_wordlist_10_20_mins_1200.csv
-    parser.add_argument('--save_folder', type=str, default= "./Downloaded_videos/", help='Path to the folder to save the videos')
-    parser.add_argument('--format', type=str, default= "any", help='Format of the video to download')
-    parser.add_argument('--n_jobs', type=int, default= 10, help='Number of parallel jobs')
+    add_download_arguments(parser)
     args = parser.parse_args()
 
-    # read the csv file
-    file = args.csv_file
-    df = pd.read_csv(file)
-    # add the ids to the dataframe
-    df['id'] = [i.split('/')[-1] for i in df['url'].values]
-    # read ids and urls from the dataframe
-    ids = df['id'].values
-    urls = df['url'].values
-    # extract duration from "duration" column
-    duration = df['play_time'].values
-    # convert duration to total seconds
-    # duration = [str(int(i.split(':')[0])*60 + int(i.split(':')[1])) for i in duration] 
-    for i,j in enumerate(duration):
-        try:  
-            duration[i] = str(j)
-        except:
-            print(i,j)
-            duration[i] = 'None'
+    manifest = prepare_save_folder(args.save_folder)
 
-    # create the save folder if it does not exist
-    if not os.path.exists(args.save_folder):
-        os.mkdir(args.save_folder)
-    
-    # list of files in the save folder
-    files = os.listdir(args.save_folder)
-    # strip the duration from the file name
-    files = [i.split('_')[0] for i in files]
-    print("Total files already present: ", len(files))
-
-    # download each video and save as id_shape_duration
-    tasks = [(args.save_folder, d, duration, urls, files, i, args.format) for i, d in enumerate(ids)]
-    Parallel(n_jobs=args.n_jobs)(delayed(download_video)(*t) for t in tqdm(tasks))
-
-    # cleaning the save folder; remove the files with .part and .ytdl extension 
-    for i in os.listdir(args.save_folder):
-        if i.endswith('.part') or i.endswith('.ytdl'):
-            os.remove(args.save_folder+i)
+    # download each video and save as id_duration; the csv file is streamed in chunks
+    tasks = tasks_from_args(args, iter_videos(args.csv_file, args.chunksize), manifest)
+    if args.scheduler == "pipeline":
+        asyncio.run(run_pipeline(tasks, args.probe_jobs, args.transfer_jobs, per_host=args.per_host, max_bandwidth=args.max_bandwidth, probe_per_host=args.probe_per_host))
+    else:
+        Parallel(n_jobs=args.n_jobs)(delayed(download_video)(t) for t in tqdm(tasks))
+
+    clean_save_folder(args.save_folder, manifest)
 
 #--------------------------------------------------------------*****--------------------------------------------------------------#
 if __name__ == '__main__':
@@ -0,0 +1,102 @@
+'''
+    Persistent index of the video IDs already collected by the searches
+    - IDIndex(path): SQLite table of IDs; opening it does not read anything
+    - IDIndex.rebuild(searched_csv_root): re-create the index from the searched csv files
+    - IDIndex.is_complete(): True once a rebuild has finished; an interrupted rebuild leaves the index incomplete
+    - IDIndex.add(ids): append the IDs of a saved batch
+    - IDIndex.contains(ids): boolean mask of the IDs already in the index
+
+    Rebuild the index of the existing csv files:
+    python id_index.py --searched_csv_root ./searched_csv/
+
+'''
+
+import os
+import sqlite3
+import argparse
+import numpy as np
+import pandas as pd
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+class IDIndex():
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS ids (id TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM ids").fetchone()[0]
+
+    def __contains__(self, id):
+        return self.conn.execute("SELECT 1 FROM ids WHERE id = ?", (str(id),)).fetchone() is not None
+
+    def add(self, ids):
+        '''
+            Add IDs to the index; IDs already in the index are ignored
+
+            Args:
+            - ids (iterable): IDs to add
+        '''
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO ids (id) VALUES (?)", ((str(i),) for i in ids))
+
+    def contains(self, ids, chunk_size=500):
+        '''
+            Check which IDs are already in the index
+
+            Args:
+            - ids (iterable): IDs to check
+            - chunk_size (int): IDs looked up per query; SQLite limits the number of query parameters
+
+            Returns:
+            - ndarray: boolean mask, True if the ID is in the index
+        '''
+        ids = [str(i) for i in ids]
+        found = set()
+        for k in range(0, len(ids), chunk_size):
+            chunk = ids[k:k+chunk_size]
+            query = "SELECT id FROM ids WHERE id IN ({})".format(",".join("?"*len(chunk)))
+            found.update(row[0] for row in self.conn.execute(query, chunk))
+        return np.fromiter((i in found for i in ids), dtype=bool, count=len(ids))
+
+    def is_complete(self):
+        return self.conn.execute("SELECT 1 FROM meta WHERE key = 'complete'").fetchone() is not None
+
+    def rebuild(self, searched_csv_root):
+        '''
+            Re-create the index from the IDs of all searched csv files
+
+            Args:
+            - searched_csv_root (str): directory of the searched csv files
+        '''
+        with self.conn:
+            self.conn.execute("DELETE FROM meta WHERE key = 'complete'")
+            self.conn.execute("DELETE FROM ids")
+        for i in os.listdir(searched_csv_root):
+            if os.path.isfile(searched_csv_root+i) and i.endswith('.csv'):
+                self.add(pd.read_csv(searched_csv_root+i, usecols=['id'], dtype={'id': str})['id'].dropna())
+        # the index is complete only once every csv file is in it
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('complete', '1')")
+
+    def close(self):
+        self.conn.close()
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--searched_csv_root", default="./searched_csv/", help="Directory of the searched csv files")
+    parser.add_argument("--index_file", default=None, help="Path of the index; defaults to id_index.sqlite in searched_csv_root")
+    args = parser.parse_args()
+
+    index = IDIndex(args.index_file or args.searched_csv_root+'id_index.sqlite')
+    index.rebuild(args.searched_csv_root)
+    print('Indexed IDs: ', len(index))
+    index.close()
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+if __name__ == "__main__":
+    main()
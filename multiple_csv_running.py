@@ -1,17 +1,111 @@
-# for download_vimeo_urls.py, running with multiple csv files in sequence 
+# for download_vimeo_urls.py, running with multiple csv files in one go
+"""
+    The IDs of all the csv files are merged and deduplicated up front and downloaded by one worker pool, so the pool
+    stays busy across file boundaries; a csv file is reported as soon as all of its videos are done.
 
-#--------------------------------------------------------------*****--------------------------------------------------------------# 
-import os 
-import subprocess 
-import pandas as pd 
+    NOTE: an ID listed in several csv files is downloaded once and counted in each of them.
+
+    Usage:
+    python multiple_csv_running.py --csv_glob './searched_csv/*.csv' --save_folder ./Downloaded_videos/ --n_jobs 10
+
+"""
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
 import glob
+import argparse
+import asyncio
+from tqdm import tqdm
+from collections import Counter
+from joblib import Parallel, delayed
+
+from download_vimeo_urls import add_download_arguments, tasks_from_args, iter_videos, download_video, run_pipeline, prepare_save_folder, clean_save_folder
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+def merge_csv_files(csv_files, chunksize=10000):
+    '''
+        Merge the videos of the csv files, keeping the first occurrence of every ID; the csv files are read in chunks
+
+        Args:
+        - csv_files (list): paths of the csv files
+        - chunksize (int): number of csv rows read at once
+
+        Returns:
+        - videos (list): (id, url, duration) of the unique videos
+        - sources (dict): csv file -> list of its unique IDs
+    '''
+    videos = []
+    seen = set()
+    sources = {}
+    for csv_file in csv_files:
+        csv_ids = {}
+        for d, url, duration in iter_videos(csv_file, chunksize):
+            csv_ids[d] = None
+            if d in seen:
+                continue
+            seen.add(d)
+            videos.append((d, url, duration))
+        sources[csv_file] = list(csv_ids)
+    return videos, sources
+
+def download_task(task):
+    # download_video of a task; returns (id, status)
+    return task.id, download_video(task)
+
+class csv_progress():
+    '''
+        Per csv completion stats; a csv file is reported once all of its videos are done
+    '''
+    def __init__(self, sources):
+        self.remaining = {csv_file: len(csv_ids) for csv_file, csv_ids in sources.items()}
+        self.csv_files = {}
+        for csv_file, csv_ids in sources.items():
+            for d in csv_ids:
+                self.csv_files.setdefault(d, []).append(csv_file)
+        self.stats = {csv_file: Counter() for csv_file in sources}
+
+    def update(self, d, status):
+        for csv_file in self.csv_files.get(d, []):
+            self.stats[csv_file][status] += 1
+            self.remaining[csv_file] -= 1
+            if self.remaining[csv_file] == 0:
+                tqdm.write("Finished csv file: {} {}".format(csv_file, self.format(csv_file)))
+
+    def format(self, csv_file):
+        stats = self.stats[csv_file]
+        return "(downloaded: {}, already present: {}, failed: {})".format(stats['downloaded'], stats['exists'], stats['failed'])
+
+    def summary(self):
+        for csv_file in self.stats:
+            print(csv_file, self.format(csv_file))
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+def main():
+    parser = argparse.ArgumentParser(description='Download the videos of multiple csv files with one worker pool')
+    parser.add_argument('--csv_glob', type=str, default= "./searched_csv/*.csv", help='Glob pattern of the csv files')
+    add_download_arguments(parser)
+    args = parser.parse_args()
+
+    # list all csv files using glob
+    csv_files = sorted(glob.glob(args.csv_glob))
+    videos, sources = merge_csv_files(csv_files, args.chunksize)
+    print("Csv files: {}, unique videos: {}".format(len(csv_files), len(videos)))
+
+    manifest = prepare_save_folder(args.save_folder)
+    progress = csv_progress(sources)
+
+    # one queue of all the videos for one worker pool
+    tasks = tasks_from_args(args, videos, manifest)
+    if args.scheduler == "pipeline":
+        asyncio.run(run_pipeline(tasks, args.probe_jobs, args.transfer_jobs, per_host=args.per_host, max_bandwidth=args.max_bandwidth,
+                                 callback=lambda task, status: progress.update(task.id, status), total=len(videos), probe_per_host=args.probe_per_host))
+    else:
+        statuses = Parallel(n_jobs=args.n_jobs, return_as="generator_unordered")(delayed(download_task)(t) for t in tasks)
+        for d, status in tqdm(statuses, total=len(videos)):
+            progress.update(d, status)
 
-# list all csv files using glob 
-csv_files = glob.glob('./searched_csv/*.csv')
-#print(csv_files[0])
+    clean_save_folder(args.save_folder, manifest)
+    progress.summary()
 
-# run the download script for each csv file 
-for csv_file in csv_files:
-    print("Downloading videos from csv file: ", csv_file)
-    # run the download script 
-    os.system('python download_vimeo_urls.py --csv_file '+csv_file+' --save_folder /media/ss223464/Expansion1/Shreshth-2/Datasets/Vimeo/All_Combined_keywords/')
\ No newline at end of file
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+if __name__ == '__main__':
+    main()
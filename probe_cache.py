@@ -0,0 +1,88 @@
+'''
+    Persistent cache of the media probes (ffprobe json, mediainfo output, ...) of the downloaded videos
+    - ProbeCache(path): SQLite table of (path, tool) -> file signature and probe result
+    - ProbeCache.get(file, tool, probe): the cached result if the file is unchanged, else probe(file), stored for the next run
+    - file_signature(file, partial_hash): (size, mtime_ns, inode, hash) of a file
+
+    NOTE: a file is probed again only if its size, mtime or inode changed; with partial_hash a sha1 of its first and
+    last 4 KiB is compared as well, for copies that kept the mtime.
+    NOTE: results must be JSON serializable; failed probes (None) are not cached.
+    NOTE: each thread opens its own connection with get_probe_cache(path); SQLite serialises the writers.
+
+'''
+
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+def file_signature(file, partial_hash=False, block_size=4096):
+    '''
+        Signature of a file; the hash is None without partial_hash
+    '''
+    st = os.stat(file)
+    digest = None
+    if partial_hash:
+        sha = hashlib.sha1()
+        with open(file, 'rb') as f:
+            sha.update(f.read(block_size))
+            if st.st_size > block_size:
+                f.seek(max(block_size, st.st_size - block_size))
+                sha.update(f.read(block_size))
+        digest = sha.hexdigest()
+    return st.st_size, st.st_mtime_ns, st.st_ino, digest
+
+class ProbeCache():
+    def __init__(self, path, partial_hash=False):
+        self.path = path
+        self.partial_hash = partial_hash
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS probes (path TEXT, tool TEXT, size INTEGER, mtime_ns INTEGER, inode INTEGER, hash TEXT, result TEXT, "
+                          "PRIMARY KEY (path, tool)) WITHOUT ROWID")
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM probes").fetchone()[0]
+
+    def get(self, file, tool, probe):
+        '''
+            Probe result of a file, probed again only if the file changed
+
+            Args:
+            - file (str): media file
+            - tool (str): name of the probe, e.g. ffprobe; a file has one entry per tool
+            - probe (function): probe(file) -> JSON serializable result, None if the probe failed
+
+            Returns:
+            - the result of probe(file)
+        '''
+        key = os.path.abspath(file)
+        signature = file_signature(file, self.partial_hash)
+        row = self.conn.execute("SELECT size, mtime_ns, inode, hash, result FROM probes WHERE path = ? AND tool = ?", (key, tool)).fetchone()
+        if row is not None and tuple(row[:4]) == signature:
+            return json.loads(row[4])
+
+        result = probe(file)
+        if result is not None:
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO probes (path, tool, size, mtime_ns, inode, hash, result) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                  (key, tool) + signature + (json.dumps(result),))
+        return result
+
+    def close(self):
+        self.conn.close()
+
+_caches = {}
+
+def get_probe_cache(path, partial_hash=False):
+    '''
+        Probe cache connection of the current thread; opened on first use
+    '''
+    key = (path, partial_hash, threading.get_ident())
+    if key not in _caches:
+        _caches[key] = ProbeCache(path, partial_hash)
+    return _caches[key]
@@ -0,0 +1,20 @@
+import os
+import sys
+import importlib.util
+
+import pytest
+
+# the scripts of the repository are imported from its root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def search_batches():
+    # vimeo-search_batches.py is not an importable module name
+    spec = importlib.util.spec_from_file_location("vimeo_search_batches", os.path.join(ROOT, "vimeo-search_batches.py"))
+    module = importlib.util.module_from_spec(spec)
+    # registered so the process pool of --workers can pickle its functions
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,37 @@
+import random
+
+import pytest
+from better_profanity import profanity
+
+from censor_word import censor_words
+
+
+@pytest.fixture(scope="module")
+def sample_words():
+    # clean keywords, wordlist entries, their character substitutions and phrases, with repeats
+    rng = random.Random(0)
+    profanity.load_censor_words()
+    wordlist = sorted(str(w) for w in profanity.CENSOR_WORDSET)
+    bad = rng.sample(wordlist, 150)
+    substituted = ["".join(rng.choice(sorted(profanity.CHARS_MAPPING.get(c, {c}))) for c in word) for word in bad[:50]]
+    clean = ["nature", "sunset timelapse", "4k hdr", "drone flight over alps", "cooking", "", "  ", "123", "café", "日本",
+             "Classic", "assessment", "scunthorpe", "hello-world", "HDR10+"]
+    phrases = [" ".join(rng.sample(clean[:5] + bad[:20], 3)) for _ in range(50)]
+    cased = [word.upper() for word in bad[:20]] + [word.capitalize() + "!" for word in bad[20:40]]
+    words = bad + substituted + clean + phrases + cased
+    return words + rng.sample(words, 100)
+
+
+def test_censor_words_matches_profanity(sample_words):
+    assert censor_words(sample_words, n_jobs=1).censor_words() == [profanity.censor(word) for word in sample_words]
+
+
+def test_censor_words_in_batches_matches_profanity(sample_words):
+    # several batches over a process pool
+    cleaned = censor_words(sample_words, n_jobs=2, batch_size=64).censor_words()
+    assert cleaned == [profanity.censor(word) for word in sample_words]
+
+
+def test_censor_words_keeps_order_and_repeats():
+    words = ["nature", "shit", "nature", "Shit happens"]
+    assert censor_words(words, n_jobs=1).censor_words() == ["nature", "****", "nature", "**** happens"]
@@ -0,0 +1,89 @@
+import os
+import json
+import shutil
+import subprocess
+
+import pytest
+
+import check_hdr
+from container_hdr import read_video_header, header_verdict
+
+BT2020 = ["-color_primaries", "bt2020", "-colorspace", "bt2020nc"]
+
+# name -> (ffmpeg encoding arguments, HDR, decided by the container header)
+CLIPS = {
+    "hdr10_hevc.mp4": (["-c:v", "libx265", "-x265-params", "log-level=error", "-pix_fmt", "yuv420p10le", "-color_trc", "smpte2084"] + BT2020, True, True),
+    "hlg_hevc.mkv": (["-c:v", "libx265", "-x265-params", "log-level=error", "-pix_fmt", "yuv420p10le", "-color_trc", "arib-std-b67"] + BT2020, True, True),
+    "hdr10_vp9.webm": (["-c:v", "libvpx-vp9", "-pix_fmt", "yuv420p10le", "-color_trc", "smpte2084"] + BT2020, True, True),
+    "sdr_h264.mp4": (["-c:v", "libx264", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"], False, True),
+    "sdr_h264_untagged.mov": (["-c:v", "libx264", "-pix_fmt", "yuv420p"], False, False),
+    "sdr_vp9.webm": (["-c:v", "libvpx-vp9", "-pix_fmt", "yuv420p", "-color_primaries", "bt709", "-color_trc", "bt709", "-colorspace", "bt709"], False, False),
+}
+# untagged colours and VP9 without codec private data (unknown bit depth) are left to ffprobe
+DECIDED = sorted(name for name, clip in CLIPS.items() if clip[2])
+
+requires_ffprobe = pytest.mark.skipif(shutil.which("ffprobe") is None, reason="ffprobe is not installed")
+
+
+@pytest.fixture(scope="module")
+def clips(tmp_path_factory):
+    # tiny synthetic clips: 4 frames of a test pattern
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("ffmpeg is not installed")
+    folder = tmp_path_factory.mktemp("clips")
+    for name, (args, _, _) in CLIPS.items():
+        subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=size=64x64:rate=4", "-frames:v", "4"] + args + [str(folder / name)], check=True)
+    return folder
+
+
+@pytest.mark.parametrize("name", sorted(CLIPS))
+def test_header_verdict(clips, name):
+    _, hdr, decided = CLIPS[name]
+    assert header_verdict(read_video_header(str(clips / name))) is (hdr if decided else None)
+
+
+@pytest.mark.parametrize("name", DECIDED)
+def test_header_probe_needs_no_ffprobe(clips, name, monkeypatch):
+    def no_ffprobe(video_path, cache_file=None):
+        raise AssertionError("ffprobe was run")
+    monkeypatch.setattr(check_hdr, "cached_probe_video", no_ffprobe)
+    assert check_hdr.is_hdr_stream(check_hdr.header_probe_video(str(clips / name))) is CLIPS[name][1]
+
+
+@requires_ffprobe
+@pytest.mark.parametrize("name", sorted(CLIPS))
+def test_is_video_hdr(clips, name):
+    assert check_hdr.is_video_hdr(str(clips / name)) is CLIPS[name][1]
+
+
+@requires_ffprobe
+@pytest.mark.parametrize("name", sorted(CLIPS))
+def test_header_matches_ffprobe(clips, name):
+    assert check_hdr.is_hdr_stream(check_hdr.header_probe_video(str(clips / name))) == check_hdr.is_video_hdr(str(clips / name))
+
+
+@requires_ffprobe
+@pytest.mark.parametrize("reader", ["header", "ffprobe"])
+def test_main_lists_the_hdr_clips(clips, tmp_path, monkeypatch, reader):
+    monkeypatch.chdir(tmp_path)
+    check_hdr.main(str(clips), HDR_list=True, workers=4, cache_file=str(tmp_path / "cache.sqlite"), reader=reader)
+    with open(tmp_path / (clips.name + "_HDR.csv")) as f:
+        listed = sorted(os.path.basename(line.strip()) for line in f)
+    assert listed == sorted(name for name, (_, hdr, _) in CLIPS.items() if hdr)
+
+
+@requires_ffprobe
+def test_dump_json_probes_each_file_once(clips, tmp_path, monkeypatch):
+    calls = []
+    probe_video = check_hdr.probe_video
+
+    def counted(video_path):
+        calls.append(video_path)
+        return probe_video(video_path)
+    monkeypatch.setattr(check_hdr, "probe_video", counted)
+    monkeypatch.chdir(tmp_path)
+    check_hdr.main(str(clips), dump_json=True, workers=4, cache_file="")
+    assert sorted(calls) == sorted(str(clips / name) for name in CLIPS)
+    for name in CLIPS:
+        with open(tmp_path / (name.split('.')[0] + ".json")) as f:
+            assert json.load(f)["streams"]
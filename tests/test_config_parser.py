@@ -0,0 +1,89 @@
+import os
+from json import loads
+
+import pytest
+
+from vimeo_search_python.config_parser import iter_clips
+from vimeo_search_python.vimeo_search import VimeoSearch
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+PAGES = ["search_page.html", "search_page_escapes.html", "search_page_duplicates.html"]
+
+
+def read_page(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def legacy_clips(text):
+    # the parser of query_vimeo before iter_clips
+    index1 = text.index("vimeo.config = ")
+    index1 = text.index("[", index1)
+    index2 = text.index("}}}]", index1) + 4
+    return loads(text[index1:index2])
+
+
+def legacy_results(pages, license="by", encoded_search="nature"):
+    # the results of query_vimeo before the title index, for consecutive pages
+    all_results = []
+    collected_ids = set()
+    for text in pages:
+        temp_results = []
+        for content in legacy_clips(text):
+            title = content["clip"]["name"] + " "
+            while title in [video["title"] for video in all_results]:
+                title += "I"
+            temp_results.append({
+                "url": content["clip"]["link"],
+                "id": content["clip"]["link"].split("/")[-1],
+                "play_time": content["clip"]["duration"],
+                "date": content["clip"]["created_time"][:7],
+                "channel": content["clip"]["user"]["name"],
+                "title": title,
+                "license": license,
+                "keyword": encoded_search
+            })
+        for result in temp_results:
+            if result['url'].split('/')[-1] in collected_ids:
+                continue
+            collected_ids.add(result['url'].split('/')[-1])
+            all_results.append(result)
+    return all_results
+
+
+@pytest.mark.parametrize("name", PAGES)
+def test_iter_clips_matches_the_legacy_parser(name):
+    text = read_page(name)
+    assert list(iter_clips(text)) == legacy_clips(text)
+
+
+def test_iter_clips_is_lazy():
+    clips = iter_clips(read_page("search_page.html"))
+    assert next(clips)["clip"]["name"] == "Nature HDR 0"
+
+
+def test_page_without_clip_array():
+    text = read_page("search_page_no_results.html")
+    with pytest.raises(ValueError):
+        legacy_clips(text)
+    with pytest.raises(ValueError):
+        list(iter_clips(text))
+
+
+def test_empty_clip_array():
+    assert list(iter_clips("<script>vimeo.config = [ ];</script>")) == []
+
+
+def test_malformed_clip_array():
+    with pytest.raises(ValueError):
+        list(iter_clips('<script>vimeo.config = [{"clip": {}} {"clip": {}}];</script>'))
+
+
+def test_page_results_match_the_legacy_search():
+    # names repeated on later pages get their "I" suffixes from the title index
+    duplicates = read_page("search_page_duplicates.html")
+    pages = [duplicates, read_page("search_page.html"), duplicates.replace("vimeo.com/1000", "vimeo.com/2000"), read_page("search_page_escapes.html")]
+    searcher = VimeoSearch()
+    for text in pages:
+        searcher.collect_results(searcher.parse_page(text, "by", "nature"))
+    assert searcher.all_results == legacy_results(pages)
@@ -0,0 +1,73 @@
+import os
+import time
+import shutil
+import functools
+import threading
+import subprocess
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import download_vimeo_urls
+from download_manifest import get_manifest
+from vimeo_search_python.retry_policy import RetryPolicy, RETRY
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def hls_server(tmp_path):
+    # 4 one second segments of a test pattern
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("ffmpeg is not installed")
+    media = tmp_path / "media"
+    media.mkdir()
+    subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=size=64x64:rate=10", "-t", "4", "-c:v", "libx264",
+                    "-g", "10", "-hls_time", "1", "-hls_list_size", "0", str(media / "v.m3u8")], check=True)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(media)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield media, "http://127.0.0.1:{}/v.m3u8".format(server.server_address[1])
+    server.shutdown()
+
+
+def hls_info(url):
+    return {"id": "v", "title": "v", "extractor": "generic", "extractor_key": "Generic", "webpage_url": url, "epoch": time.time(),
+            "formats": [{"format_id": "hls", "url": url, "protocol": "m3u8_native", "ext": "ts", "vcodec": "h264"}]}
+
+
+@pytest.fixture
+def no_retries(monkeypatch):
+    monkeypatch.setattr(download_vimeo_urls, "get_retry_policy", lambda: RetryPolicy(max_retries=0))
+
+
+def test_inprocess_engine_records_skipped_fragments():
+    from yt_dlp.downloader.fragment import FragmentFD
+    engine = download_vimeo_urls.InProcessEngine()
+    FragmentFD(engine.ydl, engine.ydl.params).report_skip_fragment(3, 'fragment not found')
+    assert len(engine.errors) == 1
+    assert RetryPolicy().classify(errors=engine.errors) == RETRY
+
+
+@pytest.mark.parametrize("engine", ["subprocess", "inprocess"])
+def test_complete_fragments_are_downloaded(hls_server, tmp_path, engine, no_retries):
+    media, url = hls_server
+    save_folder = str(tmp_path / "videos") + "/"
+    manifest = download_vimeo_urls.prepare_save_folder(save_folder)
+    task = download_vimeo_urls.DownloadTask(save_folder, "v", "4", url, manifest, "any", engine, 2)
+    assert download_vimeo_urls.transfer_task(task, hls_info(url), "hls") == "downloaded"
+    assert os.path.isfile(save_folder + "v_4.ts")
+
+
+@pytest.mark.parametrize("engine", ["subprocess", "inprocess"])
+def test_missing_fragment_fails_the_download(hls_server, tmp_path, engine, no_retries):
+    media, url = hls_server
+    os.remove(media / "v2.ts")
+    save_folder = str(tmp_path / "videos") + "/"
+    manifest = download_vimeo_urls.prepare_save_folder(save_folder)
+    task = download_vimeo_urls.DownloadTask(save_folder, "v", "4", url, manifest, "any", engine, 2)
+    assert download_vimeo_urls.transfer_task(task, hls_info(url), "hls") == "failed"
+    assert "v" not in get_manifest(manifest)
+    assert not os.path.exists(save_folder + "v_4.ts")
@@ -0,0 +1,30 @@
+import pytest
+
+import download_vimeo_urls
+from download_manifest import DownloadManifest
+
+
+def test_bootstrap_records_the_videos_of_the_folder(tmp_path):
+    (tmp_path / "a_10.mp4").write_bytes(b"0" * 10)
+    (tmp_path / "b_10.mp4.part").write_bytes(b"0")
+    manifest = DownloadManifest(str(tmp_path / "manifest.sqlite"))
+    assert not manifest.is_complete()
+    manifest.bootstrap(str(tmp_path))
+    assert manifest.is_complete()
+    assert "a" in manifest and "b" not in manifest
+
+
+def test_interrupted_bootstrap_runs_again(tmp_path, monkeypatch):
+    save_folder = str(tmp_path) + "/"
+    (tmp_path / "a_10.mp4").write_bytes(b"0" * 10)
+
+    def interrupted(self, save_folder):
+        raise KeyboardInterrupt
+    with monkeypatch.context() as m:
+        m.setattr(DownloadManifest, "bootstrap", interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            download_vimeo_urls.prepare_save_folder(save_folder)
+
+    # the manifest file exists but was never filled
+    manifest = download_vimeo_urls.prepare_save_folder(save_folder)
+    assert "a" in DownloadManifest(manifest)
@@ -0,0 +1,49 @@
+import time
+import asyncio
+import threading
+
+import download_vimeo_urls
+
+
+class Concurrency():
+    # peak number of calls running at the same time
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+
+    def __call__(self, result):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        return result
+
+
+def tasks(n, manifest):
+    return [download_vimeo_urls.DownloadTask("/tmp/", str(i), "10", "https://vimeo.com/" + str(i), manifest, "any", "subprocess")
+            for i in range(n)]
+
+
+def test_probes_are_not_limited_by_the_transfer_host_slots(monkeypatch, tmp_path):
+    probes = Concurrency()
+    monkeypatch.setattr(download_vimeo_urls, "probe_task", lambda task: probes(None))
+    statuses = []
+    asyncio.run(download_vimeo_urls.run_pipeline(tasks(32, str(tmp_path / "manifest.sqlite")), probe_jobs=16, per_host=2,
+                                                 callback=lambda task, status: statuses.append(status)))
+    assert statuses == ["exists"] * 32
+    assert probes.peak == 16
+
+
+def test_probe_and_transfer_host_limits(monkeypatch, tmp_path):
+    probes, transfers = Concurrency(), Concurrency()
+    monkeypatch.setattr(download_vimeo_urls, "probe_task", lambda task: probes(({}, "f")))
+    monkeypatch.setattr(download_vimeo_urls, "transfer_task", lambda task, info, format, rate_limit: transfers("downloaded"))
+    statuses = []
+    asyncio.run(download_vimeo_urls.run_pipeline(tasks(16, str(tmp_path / "manifest.sqlite")), probe_jobs=8, transfer_jobs=8, per_host=2,
+                                                 probe_per_host=4, callback=lambda task, status: statuses.append(status)))
+    assert statuses == ["downloaded"] * 16
+    assert probes.peak == 4
+    assert transfers.peak == 2
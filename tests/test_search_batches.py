@@ -0,0 +1,80 @@
+import pandas as pd
+
+from id_index import IDIndex
+
+
+def result(i, keyword="k"):
+    return {"url": "https://vimeo.com/" + str(i), "id": str(i), "play_time": 60, "date": "2023-01",
+            "channel": "c", "title": "t ", "license": "by", "keyword": keyword}
+
+
+def test_verify_merge_drops_batch_and_previous_ids(search_batches, tmp_path):
+    prev_ids = IDIndex(str(tmp_path / "index.sqlite"))
+    prev_ids.add(["2"])
+    batch_ids = {"1"}
+    df = search_batches.verify_merge(pd.DataFrame([result(i) for i in (1, 2, 3)]), batch_ids, prev_ids, "k")
+    assert df["id"].tolist() == ["3"]
+    assert batch_ids == {"1", "3"}
+
+
+def test_verify_merge_keyword_without_results(search_batches, tmp_path):
+    # results_to_df([]) has no columns
+    prev_ids = IDIndex(str(tmp_path / "index.sqlite"))
+    batch_ids = set()
+    df = search_batches.verify_merge(pd.DataFrame([]), batch_ids, prev_ids, "k")
+    assert len(df) == 0
+    assert batch_ids == set()
+
+
+class FakeSearcher():
+    journal = None
+
+    class rate_limiter():
+        @staticmethod
+        def metrics():
+            return {}
+
+
+def test_search_vimeo_keyword_without_results(search_batches, tmp_path, monkeypatch):
+    keywords = tmp_path / "keywords.csv"
+    pd.DataFrame({"keyword": ["empty", "full"]}).to_csv(keywords, index=False)
+    root = str(tmp_path / "searched") + "/"
+    # skip the censoring of the keywords
+    (tmp_path / "searched" / "keywords").mkdir(parents=True)
+    pd.DataFrame(["empty", "full"]).to_csv(root + "keywords/cleaned_keywords.csv", index=False)
+
+    results = {"empty": [], "full": [result(1, "full"), result(2, "full")]}
+    monkeypatch.setattr(search_batches, "make_searcher", lambda *args, **kwargs: FakeSearcher())
+    monkeypatch.setattr(search_batches, "search_keyword", lambda searcher, keyword, extra: pd.DataFrame(results[keyword]))
+
+    search_batches.search_vimeo(str(keywords), "", 10, "hdr+free+allCC+any", searched_csv_root=root)
+
+    df = pd.read_csv(root + "hdr+free+allCC+any__keywords_batch_0.csv", dtype={"id": str})
+    assert df["id"].tolist() == ["1", "2"]
+
+
+def test_shared_id_set_claims_each_id_once(search_batches):
+    ids = search_batches.SharedIDSet()
+    assert ids.claim(["1", "2"]) == [True, True]
+    assert ids.claim(["2", "3", "3"]) == [False, True, False]
+    ids.clear()
+    assert ids.claim(["1"]) == [True]
+
+
+def test_search_vimeo_workers_keep_an_id_once(search_batches, tmp_path, monkeypatch):
+    keywords = tmp_path / "keywords.csv"
+    names = ["a", "b", "c", "d"]
+    pd.DataFrame({"keyword": names}).to_csv(keywords, index=False)
+    root = str(tmp_path / "searched") + "/"
+    (tmp_path / "searched" / "keywords").mkdir(parents=True)
+    pd.DataFrame(names).to_csv(root + "keywords/cleaned_keywords.csv", index=False)
+
+    # every keyword finds its own video and the shared video 0
+    results = {k: [result(0, k), result(n + 1, k)] for n, k in enumerate(names)}
+    monkeypatch.setattr(search_batches, "make_searcher", lambda *args, **kwargs: FakeSearcher())
+    monkeypatch.setattr(search_batches, "search_keyword", lambda searcher, keyword, extra: pd.DataFrame(results[keyword]))
+
+    search_batches.search_vimeo(str(keywords), "", 10, "hdr+free+allCC+any", searched_csv_root=root, workers=2)
+
+    df = pd.read_csv(root + "hdr+free+allCC+any__keywords_batch_0.csv", dtype={"id": str})
+    assert sorted(df["id"].tolist()) == ["0", "1", "2", "3", "4"]
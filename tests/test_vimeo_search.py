@@ -0,0 +1,62 @@
+import requests
+
+from vimeo_search_python.vimeo_search import VimeoSearch
+from vimeo_search_python.rate_limiter import AdaptiveRateLimiter
+from vimeo_search_python.retry_policy import RetryPolicy
+
+
+class FakeResponse():
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+        self.headers = {}
+
+
+class FakeSession():
+    # replays the given responses; an exception is raised instead of returned
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.urls = []
+
+    def get(self, url, headers=None):
+        self.urls.append(url)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def make_searcher(session):
+    return VimeoSearch(session=session, retry_policy=RetryPolicy(base_delay=0.0, reset_timeout=0.0), rate_limiter=AdaptiveRateLimiter(rate=1000.0, burst=10.0))
+
+
+def test_get_total_pages_is_paced_and_retried():
+    session = FakeSession([requests.ConnectionError("Connection reset"), FakeResponse(503),
+                           FakeResponse(200, '<div class="total_results">25</div>')])
+    searcher = make_searcher(session)
+    assert searcher.get_total_pages("nature") == 3
+    assert len(session.urls) == 3
+    assert searcher.rate_limiter.metrics()["requests"] == 3
+
+
+def test_get_total_pages_gives_up_after_the_retries():
+    session = FakeSession([FakeResponse(429)] * 6)
+    searcher = make_searcher(session)
+    assert searcher.get_total_pages("nature") is None
+    assert len(session.urls) == 6
+
+
+def test_resumed_keyword_sends_no_request(search_batches, tmp_path):
+    from vimeo_search_python.checkpoint import CheckpointJournal
+    journal = CheckpointJournal(str(tmp_path / "batch_0.journal"))
+    searcher = make_searcher(FakeSession([]))
+    searcher.journal = journal
+    page = [{"url": "https://vimeo.com/1", "id": "1", "play_time": 60, "date": "2023-01", "channel": "c",
+             "title": "t ", "license": "by", "keyword": "nature"}]
+    for _, li in searcher.license_components():
+        journal.record_page("nature", li, 1, page if li == "by" else [])
+        journal.record_done("nature", li)
+
+    df = search_batches.search_keyword(searcher, "nature", "")
+    assert df["id"].tolist() == ["1"]
+    assert searcher.session.urls == []
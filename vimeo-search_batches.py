@@ -1,7 +1,11 @@
 '''
     Vimeo search using vimeo_search_python library
-    - search_vimeo(csv_file, extra_keyword, batch_size, limit, filter_criterion, searched_csv_root='./searched_csv/')
-    - verify_merge(df_temp, df, df_prev, keyword)
+    - search_vimeo(csv_file, extra_keyword, batch_size, limit, filter_criterion, searched_csv_root='./searched_csv/', pool_size=10, stream=False, workers=1, base_url="https://vimeo.com/search")
+    - verify_merge(df_temp, batch_ids, prev_ids, keyword)
+    - make_searcher(filter_criterion, session, base_url, rate_state)
+    - search_keyword(searcher, keyword, extra_keyword)
+    - search_shard(shard) / init_shard_worker(...): process pool workers used with --workers
+    - SharedIDSet: ID set shared by the workers; claim(ids) keeps the new IDs of a keyword in one call
     - main()
     
     - Shreshth Saini, 2021
@@ -11,42 +15,180 @@
 
 import os
 import sys
+import csv
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
 import argparse
+import threading
+from multiprocessing import Pool
+from multiprocessing.managers import BaseManager
 
 from censor_word import censor_words
+from id_index import IDIndex
 from vimeo_search_python.vimeo_search import VimeoSearch
+from vimeo_search_python.session import PooledSession
+from vimeo_search_python.checkpoint import CheckpointJournal, remove_journal
+from vimeo_search_python.rate_limiter import shared_rate_limiter
 import warnings
 warnings.filterwarnings('ignore')
 
+# Columns of the searched csv files
+RESULT_COLUMNS = ['url','id','play_time','date','channel','title','license','keyword']
+
 #--------------------------------------------------------------*****--------------------------------------------------------------#
-def verify_merge(df_temp, df, df_prev, keyword):
+def verify_merge(df_temp, batch_ids, prev_ids, keyword):
     '''
         Check if the IDs are unique or not before merging
         NOTE: Checking previous search results.
 
         Args:
         - df_temp (dataframe): dataframe of search results
-        - df (dataframe): dataframe of search results
-        - df_prev (list): list of IDs of previously collected data/csv
+        - batch_ids (set): IDs already collected in the current batch; the IDs kept from df_temp are added to it
+        - prev_ids (IDIndex): index of the IDs of previously collected data/csv
         - keyword (str): keyword used for search
     ''' 
-    # now compare the IDs are unique or not
-    for k in range(len(df_temp)):
-        if df_temp['id'][k] in df['id'].values:
-            print('ID already exists: ',df_temp['id'][k])
-            df_temp.drop(k, inplace=True)
-        # remove is exists in previously collected data/csv
-        elif len(df_temp)!=0:
-            if df_temp['id'][k] in df_prev:
-                print('ID already exists in previous csv: ',df_temp['id'][k])
-                df_temp.drop(k, inplace=True)    
+    # a keyword without results gives a dataframe without any column
+    if len(df_temp) == 0 or 'id' not in df_temp.columns:
+        return df_temp
+
+    # now compare the IDs are unique or not; one hash lookup per ID, no scan of the collected IDs
+    ids = df_temp['id'].astype(str)
+    in_batch = np.fromiter((i in batch_ids for i in ids), dtype=bool, count=len(ids))
+    # remove is exists in previously collected data/csv
+    in_prev = prev_ids.contains(ids)
+    if in_batch.any() or in_prev.any():
+        print('IDs already exist: {} in current batch, {} in previous csv'.format(in_batch.sum(), (in_prev & ~in_batch).sum()))
 
+    df_temp = df_temp[~(in_batch | in_prev)]
+    batch_ids.update(df_temp['id'].astype(str))
     return df_temp
 
-def search_vimeo(csv_file, extra_keyword, batch_size, filter_criterion, searched_csv_root='./searched_csv/'):
+def make_searcher(filter_criterion, session, base_url="https://vimeo.com/search", rate_state=None):
+    '''
+        Initialize search object with filter criterion; the searcher is reused for every keyword
+
+        Args:
+        - filter_criterion (str): hdr+price+license+resolution
+        - session (PooledSession): connection pool of the searcher
+        - base_url (str): search url; anything else than https://vimeo.com/search must already contain the filters
+        - rate_state (str): state file of the rate limiter shared by all processes; None for a limiter of this process only
+    '''
+    hdr, price, license, resolution = filter_criterion.split("+")
+    return VimeoSearch(base_vimeo_url=base_url, hdr=hdr, price=price, license=license, resolution=resolution, session=session,
+                       rate_limiter=shared_rate_limiter(rate_state))
+
+def search_keyword(searcher, keyword, extra_keyword):
+    '''
+        Core search function; searches all pages of the keyword
+
+        Args:
+        - searcher (VimeoSearch): searcher, reset before the search
+        - keyword (str): keyword to search
+        - extra_keyword (str): appended to the keyword
+
+        Returns:
+        - dataframe: search results, None if the search failed
+    '''
+    print('Keyword: ',keyword)
+    try: 
+        searcher.reset()
+
+        # search the total pages; a keyword journaled as done is only replayed
+        if searcher.is_searched(keyword+extra_keyword):
+            print("Already searched: ", keyword)
+        else:
+            total_pages = searcher.get_total_pages(keyword)
+            if total_pages:
+                print(f"Total pages: {total_pages}")    
+            else:
+                print("Could not determine the total number of pages.")
+        
+        # searches all pages and return single list of dicts; improved version from YT search implement
+        search_results = searcher.search_vimeo(keyword+extra_keyword)
+
+    except Exception as e:
+        print('Error occured: ', e)
+        print("keyword: ",keyword)
+        return None
+
+    return searcher.results_to_df(search_results) # convert the list of dicts to dataframe
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+''' 
+    Process pool workers for --workers N; each process has its own searcher and connection pool
+    NOTE: IDs are claimed in a set shared by all workers, so a video found by two shards is kept once; the set lives in a
+    manager process and the IDs of a keyword are claimed in a single call under its lock.
+'''
+class SharedIDSet():
+    def __init__(self):
+        self.ids = set()
+        self.lock = threading.Lock()
+
+    def claim(self, ids):
+        '''
+            Add the IDs that are not in the set yet
+
+            Args:
+            - ids (list): IDs of a keyword
+
+            Returns:
+            - list: True for each ID added by this call
+        '''
+        with self.lock:
+            keep = []
+            for i in ids:
+                keep.append(i not in self.ids)
+                self.ids.add(i)
+            return keep
+
+    def clear(self):
+        with self.lock:
+            self.ids.clear()
+
+class IDManager(BaseManager):
+    pass
+
+IDManager.register('SharedIDSet', SharedIDSet)
+
+_shard_searcher = None
+_shard_journal = None
+_shared_ids = None
+
+def init_shard_worker(filter_criterion, pool_size, base_url, rate_state, shared_ids):
+    global _shard_searcher, _shared_ids
+    _shard_searcher = make_searcher(filter_criterion, PooledSession(pool_size), base_url, rate_state)
+    _shared_ids = shared_ids
+
+def search_shard(shard):
+    '''
+        Search all keywords of a shard in a worker process
+
+        Args:
+        - shard (tuple): (list of keywords, extra_keyword, checkpoint journal path of the batch)
+
+        Returns:
+        - list: records of the IDs claimed by this shard
+    '''
+    global _shard_journal
+    shard_keywords, extra_keyword, journal_path = shard
+    # each worker writes its own journal file of the batch and loads the files of all workers
+    if _shard_journal is None or _shard_journal.path != journal_path:
+        if _shard_journal is not None:
+            _shard_journal.close()
+        _shard_journal = CheckpointJournal(journal_path, write_suffix='.'+str(os.getpid()))
+        _shard_searcher.journal = _shard_journal
+    records = []
+    for keyword in shard_keywords:
+        df_temp = search_keyword(_shard_searcher, keyword, extra_keyword)
+        if df_temp is None or len(df_temp) == 0:
+            continue
+        keep = _shared_ids.claim(df_temp['id'].astype(str).tolist())
+        records.extend(df_temp[keep][RESULT_COLUMNS].to_dict('records'))
+    return records
+
+#--------------------------------------------------------------*****--------------------------------------------------------------#
+def search_vimeo(csv_file, extra_keyword, batch_size, filter_criterion, searched_csv_root='./searched_csv/', pool_size=10, stream=False, workers=1, base_url="https://vimeo.com/search"):
     # Create directory for saving csv file batches
     keyword_batch_root = searched_csv_root+csv_file.split("/")[-1].split(".")[0]
     print("Keywords Batch Files Directory: ", keyword_batch_root)
@@ -72,12 +214,28 @@ def search_vimeo(csv_file, extra_keyword, batch_size, filter_criterion, searched
 
     ''' 
         Checking the previous generated csv files and remove searches if ID already exists
-        NOTE: Checking previous search results. 
+        NOTE: Checking previous search results; the IDs are kept in a persistent index updated after each batch.
+        NOTE: The index is built from the csv files on the first run, and again if that build was interrupted; use id_index.py to rebuild it.
     '''
-    df_prev = []
-    for i in os.listdir(searched_csv_root):
-        if os.path.isfile(searched_csv_root+i):
-            df_prev += pd.read_csv(searched_csv_root+i)['id'].values.tolist()
+    index_file = searched_csv_root+'id_index.sqlite'
+    prev_ids = IDIndex(index_file)
+    if not prev_ids.is_complete():
+        print('Building the ID index from the previous csv files')
+        prev_ids.rebuild(searched_csv_root)
+
+    # One keep-alive connection pool and searcher shared by every license and keyword of the search
+    # NOTE: the request rate is shared by all workers (and later runs) through the rate limiter state file
+    session = PooledSession(pool_size)
+    rate_state = searched_csv_root+'rate_limiter.state'
+    searcher = make_searcher(filter_criterion, session, base_url, rate_state)
+
+    # with --workers N the keywords of each batch are split in shards searched by a process pool
+    pool = None
+    if workers > 1:
+        manager = IDManager()
+        manager.start()
+        shared_ids = manager.SharedIDSet()
+        pool = Pool(workers, initializer=init_shard_worker, initargs=(filter_criterion, pool_size, base_url, rate_state, shared_ids))
 
     ''' 
         NOTE: Divide keywords in batches and save the csv file after each batch to avoid losing collected data due to long run time or system stalls
@@ -86,6 +244,7 @@ def search_vimeo(csv_file, extra_keyword, batch_size, filter_criterion, searched
         
         print('Current Batch: ', b/batch_size)
         batch_keywords = keywords[b:b+batch_size]
+        batch_csv = searched_csv_root+filter_criterion+"_"+extra_keyword.split(" ")[-1]+"_"+csv_file.split(".")[0].split("/")[-1]+'_batch_'+str(int(b/batch_size))+'.csv'
 
         # check if the batch csv file already exists 
         if os.path.exists(keyword_batch_root+'/batch_'+ str(int(b/batch_size))+'.csv'):
@@ -93,52 +252,44 @@ def search_vimeo(csv_file, extra_keyword, batch_size, filter_criterion, searched
             print('Checking if search results already exists in the csv file....')
 
             # check if the searched results already exists in the csv file 
-            if os.path.exists(searched_csv_root+filter_criterion+"_"+extra_keyword.split(" ")[-1]+"_"+csv_file.split(".")[0].split("/")[-1]+'_batch_'+str(int(b/batch_size))+'.csv'):
+            if os.path.exists(batch_csv):
                 print('Searched results already exists for current batch! Skipping...')
                 continue
         else:
             # Save the batch of keywords to csv file; can be used to resume the search
             pd.DataFrame(batch_keywords).to_csv(keyword_batch_root+'/batch_'+ str(int(b/batch_size))+'.csv', index=False)
 
-        # Empty dataframe with columns for storing search results
-        df = pd.DataFrame(columns=['url','id','play_time','date','channel','title','license','keyword'])
-
-        # Iterate over each keyword in the batch
-        for keyword in batch_keywords:      
-            print('Keyword: ',keyword)
-            
-            ''' 
-                Core search function
-                return: search results in json format 
-            '''
-            try: 
-                # Initialize search object with keyword and filter criterion 
-                # filter_criterion = hdr+price+license+resolution
-                searcher = VimeoSearch(base_vimeo_url="https://vimeo.com/search", hdr=filter_criterion.split("+")[0], price=filter_criterion.split("+")[1], license=filter_criterion.split("+")[2], resolution=filter_criterion.split("+")[3])
-                
-                # search the total pages 
-                total_pages = searcher.get_total_pages(keyword)
-                if total_pages:
-                    print(f"Total pages: {total_pages}")    
-                else:
-                    print("Could not determine the total number of pages.")
-                
-                # searches all pages and return single list of dicts; improved version from YT search implement
-                # search the pages;  return the list of dicts 
-                search_results = searcher.search_vimeo(keyword+extra_keyword)
-
-            except:
-                try:
-                    print('Error occured: ',search_results.result())
-                except:
-                    print('Error occured: No results found!')
-                    
-                print("keyword: ",keyword)
+        # Checkpoint journal of the searched pages; a restarted batch continues from the last searched page
+        journal_path = keyword_batch_root+'/batch_'+ str(int(b/batch_size))+'.journal'
+        if pool is None:
+            journal = CheckpointJournal(journal_path)
+            searcher.journal = journal
+
+        # Search results of the batch as a list of records; the dataframe is built once at the end of the batch
+        # NOTE: in stream mode the records are written to <batch csv>.part as each keyword finishes and the file is renamed at the end of the batch
+        batch_records = []
+        batch_ids = set()
+        n_rows = 0
+        if stream:
+            stream_file = open(batch_csv+'.part', 'w', newline='', encoding='utf-8')
+            writer = csv.DictWriter(stream_file, fieldnames=RESULT_COLUMNS)
+            writer.writeheader()
+
+        # Iterate over each keyword in the batch, or over the shards of the batch with --workers
+        if pool is None:
+            batch_results = ((keyword, search_keyword(searcher, keyword, extra_keyword)) for keyword in batch_keywords)
+        else:
+            shared_ids.clear()
+            shard_size = max(1, -(-len(batch_keywords) // (workers*4)))
+            shards = [(batch_keywords[k:k+shard_size], extra_keyword, journal_path) for k in range(0, len(batch_keywords), shard_size)]
+            batch_results = (('shard', pd.DataFrame(records, columns=RESULT_COLUMNS)) for records in pool.imap_unordered(search_shard, shards))
+
+        for keyword, df_temp in batch_results:
+            if df_temp is None:
                 continue
 
             # Check if the IDs are unique or not before merging
-            df_temp = searcher.results_to_df(search_results) # convert the list of dicts to dataframe
-            df_temp = verify_merge(df_temp, df, df_prev, keyword)
+            df_temp = verify_merge(df_temp, batch_ids, prev_ids, keyword)
 
             # if dataframe lenght zero skip updating. 
             if len(df_temp) == 0:
@@ -148,18 +299,45 @@ def search_vimeo(csv_file, extra_keyword, batch_size, filter_criterion, searched
             # print the first title result from df_temp 
             print(df_temp.head(1))
 
-            #appending in the dataframe df 
-            df = df.append(df_temp)
+            #appending the records of the keyword
+            records = df_temp[RESULT_COLUMNS].to_dict('records')
+            n_rows += len(records)
+            if stream:
+                writer.writerows(records)
+                stream_file.flush()
+            else:
+                batch_records.extend(records)
 
-        # save the csv if df is not empty
-        if len(df) == 0:
-            print('Skipping saving; Length of the dataframe: ',len(df))
+        if stream:
+            stream_file.close()
+        if pool is None:
+            journal.close()
+        # save the csv if the batch is not empty
+        if n_rows == 0:
+            print('Skipping saving; Length of the dataframe: ',n_rows)
+            if stream:
+                os.remove(batch_csv+'.part')
             continue
         # Saving as csv file after each batch
-        df.to_csv(searched_csv_root+filter_criterion+"_"+extra_keyword.split(" ")[-1]+"_"+csv_file.split(".")[0].split("/")[-1]+'_batch_'+str(int(b/batch_size))+'.csv', index=False)
-        # print the csv length and first 5 rows
-        print('CSV length: ',len(df))
-        print(df.head())
+        if stream:
+            os.replace(batch_csv+'.part', batch_csv)
+        else:
+            df = pd.DataFrame(batch_records, columns=RESULT_COLUMNS)
+            df.to_csv(batch_csv, index=False)
+            print(df.head())
+        prev_ids.add(batch_ids)
+        # the journal is kept until the results of the batch are saved
+        remove_journal(journal_path)
+        # print the csv length
+        print('CSV length: ',n_rows)
+        if pool is None:
+            print('Connection stats: ', session.connection_stats())
+        print('Rate limiter: ', searcher.rate_limiter.metrics())
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+        manager.shutdown()
 
 #--------------------------------------------------------------*****--------------------------------------------------------------#
 def main():
@@ -168,9 +346,13 @@ def main():
     parser.add_argument("--extra_keyword", type=str, default="", help="Use this spaced keyword or hastag to impprove the searching. #shorts tend to return YT Shorts") # 
     parser.add_argument("--batch_size", type=int, default=10000, help="Batch size")
     parser.add_argument("--filter_criterion", default="hdr+free+allCC+any", help="Filter criterion, select option and write with +:  hdr: any, hdr, hdr10, dolby_vision; price: any, free, paid; resolution: any, 4k; license: any, by, cc0, by-nd, by-nc, by-sa, by-nc-nd, by-nc-sa, allCC")
+    parser.add_argument("--pool_size", type=int, default=10, help="Number of keep-alive connections kept per host")
+    parser.add_argument("--stream", action="store_true", help="Append the results to the batch csv as each keyword finishes")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes searching the shards of each batch")
+    parser.add_argument("--base_url", default="https://vimeo.com/search", help="Search url; a different url must already contain the filters, e.g. a local mock server")
     args = parser.parse_args()
     
-    search_vimeo(args.csv_file, args.extra_keyword, args.batch_size, args.filter_criterion)
+    search_vimeo(args.csv_file, args.extra_keyword, args.batch_size, args.filter_criterion, pool_size=args.pool_size, stream=args.stream, workers=args.workers, base_url=args.base_url)
 
 #--------------------------------------------------------------*****--------------------------------------------------------------#
 if __name__ == "__main__":
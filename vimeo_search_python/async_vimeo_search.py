@@ -0,0 +1,248 @@
+"""
+    Concurrent Vimeo search with asyncio
+
+    The pages of a single (keyword, license) query are still walked in order, as the end of the results is only known
+    from the page content; but many keyword x license queries are walked at the same time.
+
+    NOTE: max_concurrency is the global number of queries in flight; host_rate is a fixed cap per host (requests/sec) on top
+    of the adaptive rate limiter of the searcher.
+    NOTE: Transient failures are retried with the RetryPolicy of the searcher; a query waiting on a backoff or an open
+    circuit breaker only sleeps its own task, the other queries keep going.
+    NOTE: Point base_vimeo_url at a local server serving canned "vimeo.config = [...]" pages to test without hitting Vimeo.
+
+    Usage:
+    searcher = AsyncVimeoSearch(max_concurrency=16, host_rate=5)
+    results = searcher.search_all(["nature documentary", "sunset"])
+
+    async for result in searcher.search_many(keywords):
+        print(result["url"])
+
+"""
+
+import asyncio
+import copy
+import requests
+from urllib.parse import quote_plus, urlsplit
+
+from .vimeo_search import VimeoSearch
+from .retry_policy import RETRY
+
+
+class HostRateBudget():
+    """
+        Spaces out the requests sent to each host so that no host gets more than `rate` requests per second
+    """
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = {}
+
+    async def wait(self, host):
+        '''
+        Waits for the next free request slot of the host
+
+        Args:
+        - host (str): The host of the request
+        '''
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self.next_slot.get(host, now))
+        self.next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class AsyncVimeoSearch(VimeoSearch):
+    """
+        Same filters as VimeoSearch, see VimeoSearch for the options.
+        # max_concurrency: number of keyword x license queries fetched at the same time
+        # host_rate: maximum requests per second sent to a host; 0 or None for no limit
+        # NOTE: the connection pool defaults to max_concurrency connections so that every query keeps its connection alive
+
+    """
+    def __init__(self, *args, max_concurrency=16, host_rate=5.0, **kwargs):
+        kwargs.setdefault("pool_size", max_concurrency)
+        super().__init__(*args, **kwargs)
+        self.max_concurrency = max_concurrency
+        self.host_rate = host_rate
+
+    # A searcher holding the results of a single keyword; shares the user agent and filters
+    def keyword_searcher(self):
+        '''
+        Returns a copy of the searcher with empty results
+
+        Returns:
+        - AsyncVimeoSearch: The searcher for one keyword
+        '''
+        searcher = copy.copy(self)
+        searcher.reset()
+        return searcher
+
+    # Fetch a page without blocking the event loop
+    async def fetch(self, url, budget):
+        '''
+        Fetches the url once the rate budget of its host allows it
+
+        Args:
+        - url (str): The url to fetch
+        - budget (HostRateBudget): The per host rate budget
+
+        Returns:
+        - Response: The response of the request
+        '''
+        await budget.wait(urlsplit(url).netloc)
+        headers = {'user-agent': self.get_random_user_agent()}
+        return await asyncio.to_thread(self.session.get, url, headers=headers)
+
+    # Async version of VimeoSearch.get_page
+    async def get_page_async(self, url, budget):
+        '''
+        Fetches the url with the retry policy of the searcher
+
+        Args:
+        - url (str): The url to fetch
+        - budget (HostRateBudget): The per host rate budget
+
+        Returns:
+        - Response: The response, or None if the retries are exhausted
+        '''
+        host = urlsplit(url).netloc
+        policy = self.retry_policy
+        for attempt in range(policy.max_retries + 1):
+            await asyncio.sleep(policy.wait_time(host))
+            await asyncio.sleep(self.rate_limiter.reserve())
+            try:
+                response = await self.fetch(url, budget)
+            except requests.RequestException as e:
+                if policy.classify(errors=e) != RETRY:
+                    raise
+                print(f"Request failed: {e}")
+                retry_after = None
+            else:
+                self.rate_limiter.update(response.status_code)
+                if policy.classify(response.status_code) != RETRY:
+                    policy.record_success(host)
+                    return response
+                print(f"HTTP {response.status_code}. Waiting to retry...")
+                retry_after = response.headers.get("Retry-After")
+
+            policy.record_failure(host)
+            if attempt < policy.max_retries:
+                await asyncio.sleep(policy.delay(attempt, retry_after))
+        return None
+
+    # Async version of VimeoSearch.query_vimeo; puts the new results on the queue
+    async def query_vimeo_async(self, url_comp, encoded_search, license, budget, queue):
+        '''
+        Queries all pages of Vimeo search results for a given search query and license
+
+        Args:
+        - url_comp (str): The url components
+        - encoded_search (str): The search query
+        - license (str): The license type
+        - budget (HostRateBudget): The per host rate budget
+        - queue (asyncio.Queue): The queue receiving the new results
+        '''
+        page = 1
+        end_count = 0
+
+        while True:
+            url = self.page_url(url_comp, encoded_search, page)
+            response = await self.get_page_async(url, budget)
+
+            # Handle HTTP Status Codes
+            if response is None:
+                print(f"Giving up on {encoded_search} ({license}) after {self.retry_policy.max_retries} retries")
+                break
+            elif response.status_code == 400:
+                break
+            elif response.status_code != 200:
+                print(f"Error: HTTP {response.status_code} for {url}")
+                break
+
+            # Parse the response
+            try:
+                temp_results = self.parse_page(response.text, license, encoded_search)
+            except Exception as e:
+                print(f"An error occurred: {e}")
+                if self.license == "allCC":
+                    print(f"No data for this license type: {license}")
+                    break
+                if "No results found" in response.text:
+                    break
+                else:
+                    continue
+
+            if len(temp_results) == 0:
+                break
+
+            # queue only the results which were not collected before
+            n_before = len(self.all_results)
+            end_count += self.collect_results(temp_results)
+            for result in self.all_results[n_before:]:
+                await queue.put(result)
+
+            # if all ids are already collected then break the loop
+            if end_count == len(temp_results):
+                break
+
+            page += 1
+
+    # Walk the queries handed out by the shared iterator until it is exhausted
+    async def worker(self, queries, budget, queue):
+        for searcher, url_comp, encoded_search, license in queries:
+            await searcher.query_vimeo_async(url_comp, encoded_search, license, budget, queue)
+
+    # Search Vimeo for many keywords at once
+    async def search_many(self, keywords):
+        '''
+        Searches Vimeo for all keywords, running up to max_concurrency keyword x license queries at the same time
+
+        Args:
+        - keywords (list): The search queries
+
+        Yields:
+        - dict: The search results, same as VimeoSearch.search_vimeo, in the order they are collected
+        '''
+        def queries():
+            for keyword in keywords:
+                searcher = self.keyword_searcher()
+                encoded_search = quote_plus(keyword)
+                for url_comp, li in self.license_components():
+                    yield searcher, url_comp, encoded_search, li
+
+        budget = HostRateBudget(self.host_rate)
+        queue = asyncio.Queue()
+        shared_queries = queries()
+
+        async def run_workers():
+            try:
+                await asyncio.gather(*[self.worker(shared_queries, budget, queue) for _ in range(self.max_concurrency)])
+            finally:
+                await queue.put(None)
+
+        producer = asyncio.create_task(run_workers())
+        try:
+            while True:
+                result = await queue.get()
+                if result is None:
+                    break
+                yield result
+            # raise the errors of the workers, if any
+            await producer
+        finally:
+            producer.cancel()
+
+    # Blocking helper around search_many
+    def search_all(self, keywords):
+        '''
+        Searches Vimeo for all keywords concurrently
+
+        Args:
+        - keywords (list): The search queries
+
+        Returns:
+        - list: A list of dictionaries containing the search results
+        '''
+        async def collect():
+            return [result async for result in self.search_many(keywords)]
+
+        return asyncio.run(collect())
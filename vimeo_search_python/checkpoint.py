@@ -0,0 +1,107 @@
+"""
+    Append-only checkpoint journal of the search progress
+
+    Every searched page is journaled as one JSON line with its (keyword, license, page) and its parsed results; a
+    finished (keyword, license) query gets a "done" line. On restart the searcher replays the journaled pages instead
+    of fetching them again and continues from the page after the last journaled one.
+
+    NOTE: lines are flushed on every write but fsync'd at most every fsync_interval seconds (and on close), so the
+    search loop never waits on the disk; a torn last line after a crash is ignored on load.
+    NOTE: all files matching "<path>*" are loaded, so parallel workers can each write their own "<path>.<suffix>".
+
+    Usage:
+    journal = CheckpointJournal("searched_csv/keywords/batch_0.journal")
+    searcher = VimeoSearch(journal=journal)
+    ...
+    journal.close()
+    remove_journal(journal.path)  # once the results are saved
+
+"""
+
+import json
+import os
+import time
+from glob import glob
+
+
+class CheckpointJournal():
+    def __init__(self, path, write_suffix="", fsync_interval=1.0):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.pages = {}
+        self.done = set()
+
+        for journal_file in sorted(glob(path + "*")):
+            self.load(journal_file)
+
+        self.file = open(path + write_suffix, "a", encoding="utf-8")
+        self.last_fsync = time.monotonic()
+
+    # Read the entries of a journal file
+    def load(self, journal_file):
+        with open(journal_file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                key = (entry["keyword"], entry["license"])
+                if entry.get("done"):
+                    self.done.add(key)
+                else:
+                    self.pages.setdefault(key, {})[entry["page"]] = entry["results"]
+
+    def write(self, entry):
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        if time.monotonic() - self.last_fsync >= self.fsync_interval:
+            os.fsync(self.file.fileno())
+            self.last_fsync = time.monotonic()
+
+    def record_page(self, keyword, license, page, results):
+        '''
+        Journals a searched page
+
+        Args:
+        - keyword (str): The encoded search query
+        - license (str): The license type
+        - page (int): The page number
+        - results (list): The parsed results of the page
+        '''
+        self.pages.setdefault((keyword, license), {})[page] = results
+        self.write({"keyword": keyword, "license": license, "page": page, "results": results})
+
+    def record_done(self, keyword, license):
+        '''
+        Journals a finished (keyword, license) query
+        '''
+        self.done.add((keyword, license))
+        self.write({"keyword": keyword, "license": license, "done": True})
+
+    def completed_pages(self, keyword, license):
+        '''
+        Returns the results of the journaled pages of a query, in page order, up to the first missing page
+
+        Returns:
+        - list: A list of page results
+        '''
+        pages = self.pages.get((keyword, license), {})
+        completed = []
+        while len(completed) + 1 in pages:
+            completed.append(pages[len(completed) + 1])
+        return completed
+
+    def is_done(self, keyword, license):
+        return (keyword, license) in self.done
+
+    def close(self):
+        if not self.file.closed:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+
+# Remove the journal files once their results are saved
+def remove_journal(path):
+    for journal_file in glob(path + "*"):
+        os.remove(journal_file)
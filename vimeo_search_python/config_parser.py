@@ -0,0 +1,53 @@
+"""
+    Extracting the clips of the vimeo.config blob of a search result page
+
+    The page is scanned once: the clip array after "vimeo.config = " is decoded one clip at a time, in place, so the
+    page is never sliced or copied and the rest of the html is never parsed.
+
+    Usage:
+    for content in iter_clips(response.text):
+        print(content["clip"]["link"])
+
+"""
+
+import re
+from json import JSONDecoder
+
+_decoder = JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+
+
+def _skip_whitespace(text, pos):
+    return _whitespace.match(text, pos).end()
+
+
+def iter_clips(text, marker="vimeo.config = "):
+    '''
+    Yields the entries of the clip array following the marker
+
+    Args:
+    - text (str): The html of the page
+    - marker (str): The text preceding the clip array
+
+    Yields:
+    - dict: One entry of the array, with the clip under the "clip" key
+
+    Raises:
+    - ValueError: If the marker or the array is missing or the array is not valid JSON
+    '''
+    pos = text.index("[", text.index(marker)) + 1
+    pos = _skip_whitespace(text, pos)
+    if text.startswith("]", pos):
+        return
+
+    while True:
+        content, pos = _decoder.raw_decode(text, pos)
+        yield content
+
+        pos = _skip_whitespace(text, pos)
+        if text.startswith(",", pos):
+            pos = _skip_whitespace(text, pos + 1)
+        elif text.startswith("]", pos):
+            return
+        else:
+            raise ValueError(f"Expecting ',' or ']' in the clip array at char {pos}")
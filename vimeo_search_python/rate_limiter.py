@@ -0,0 +1,147 @@
+"""
+    Adaptive request rate shared by the searchers
+
+    A token bucket whose rate follows AIMD: every successful request adds `increase` requests/sec to the rate, a
+    throttled response (429 or 503) multiplies it by `decrease`. The searchers ask for a token before each request,
+    so the rate settles just under the point where Vimeo starts throttling.
+
+    NOTE: reserve() never sleeps itself; it returns the time to wait, so threads (time.sleep) and coroutines
+    (asyncio.sleep) can share the same limiter.
+    NOTE: with a state_path the bucket lives in a small JSON file locked with flock, so searcher processes (and
+    consecutive runs) share the same rate; without it, shared_rate_limiter() shares the bucket between the threads of a process.
+    NOTE: after a decrease, more 429s within `cooldown` seconds do not decrease the rate again; they are the
+    responses of requests already in flight.
+
+    Usage:
+    limiter = shared_rate_limiter("searched_csv/rate_limiter.state")
+    time.sleep(limiter.reserve())
+    response = session.get(url)
+    limiter.update(response.status_code)
+    print(limiter.metrics())
+
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows; the state file is then only safe between the threads of one process
+    fcntl = None
+
+# responses that mean the server wants fewer requests
+THROTTLE_STATUS = {429, 503}
+
+
+class AdaptiveRateLimiter():
+    """
+        # rate: starting request rate (requests/sec)
+        # min_rate, max_rate: bounds of the rate
+        # increase: requests/sec added to the rate after every successful request
+        # decrease: factor applied to the rate after a throttled response
+        # burst: number of requests that can be sent at once after an idle period
+        # cooldown: seconds after a decrease during which throttled responses do not decrease the rate again
+        # state_path: JSON file holding the bucket shared by processes; None to keep it in memory
+
+    """
+    def __init__(self, rate=5.0, min_rate=0.5, max_rate=50.0, increase=0.1, decrease=0.7, burst=1.0, cooldown=1.0, state_path=None):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst
+        self.cooldown = cooldown
+        self.state_path = state_path
+        self.lock = threading.Lock()
+        self.state = {"rate": rate, "tokens": burst, "updated": time.time(), "decreased": 0.0,
+                      "requests": 0, "throttled": 0, "decreases": 0, "waited": 0.0}
+
+    # The bucket, locked for the current thread (and process, with a state file)
+    @contextmanager
+    def locked_state(self):
+        with self.lock:
+            if self.state_path is None:
+                yield self.state
+                return
+            with open(self.state_path, "a+", encoding="utf-8") as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                try:
+                    state = json.loads(f.read())
+                except ValueError:
+                    state = dict(self.state)
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+
+    def reserve(self):
+        '''
+        Takes a token for the next request
+
+        Returns:
+        - float: The seconds to wait before sending the request
+        '''
+        with self.locked_state() as state:
+            now = time.time()
+            state["tokens"] = min(self.burst, state["tokens"] + (now - state["updated"]) * state["rate"]) - 1
+            state["updated"] = now
+            state["requests"] += 1
+            wait = -state["tokens"] / state["rate"] if state["tokens"] < 0 else 0.0
+            state["waited"] += wait
+        return wait
+
+    # Additive increase
+    def on_success(self):
+        with self.locked_state() as state:
+            state["rate"] = min(self.max_rate, state["rate"] + self.increase)
+
+    # Multiplicative decrease
+    def on_throttle(self):
+        with self.locked_state() as state:
+            now = time.time()
+            state["throttled"] += 1
+            if now - state["decreased"] >= self.cooldown:
+                state["rate"] = max(self.min_rate, state["rate"] * self.decrease)
+                state["decreased"] = now
+                state["decreases"] += 1
+                # drop the saved up tokens so the lower rate applies at once
+                state["tokens"] = min(state["tokens"], 0.0)
+
+    # Report the response of a request
+    def update(self, status):
+        '''
+        Adjusts the rate to the HTTP status of a response; other errors than throttling leave the rate unchanged
+        '''
+        if status in THROTTLE_STATUS:
+            self.on_throttle()
+        elif status < 400:
+            self.on_success()
+
+    def metrics(self):
+        '''
+        Returns the current rate (requests/sec) and the counters of the limiter
+
+        Returns:
+        - dict: rate, requests, throttled, decreases and waited (total seconds waited for a token)
+        '''
+        with self.locked_state() as state:
+            return {"rate": round(state["rate"], 2), "requests": state["requests"], "throttled": state["throttled"],
+                    "decreases": state["decreases"], "waited": round(state["waited"], 2)}
+
+
+_limiters = {}
+
+def shared_rate_limiter(state_path=None, **kwargs):
+    '''
+    Rate limiter shared by every searcher of the process using the same state_path; created on first use
+    '''
+    key = (state_path, os.getpid())
+    if key not in _limiters:
+        _limiters[key] = AdaptiveRateLimiter(state_path=state_path, **kwargs)
+    return _limiters[key]
@@ -0,0 +1,134 @@
+"""
+    Shared retry policy for the searchers and the downloader
+
+    - classify(status, errors): 'retry' for transient failures (429, 408, 5xx, timeouts, dropped connections), else 'fatal'
+    - delay(attempt, retry_after): exponential backoff with full jitter; a Retry-After header is honoured when given
+    - wait_time(host): per host circuit breaker; after failure_threshold transient failures in a row the host is left
+      alone for reset_timeout seconds, then requests are let through again and the first success closes the breaker
+
+    NOTE: the breaker is shared by every thread using the same policy; a waiting worker should move on to other work
+    (or other hosts) instead of sleeping a fixed time.
+
+    Usage:
+    policy = RetryPolicy()
+    for attempt in range(policy.max_retries + 1):
+        response = session.get(url)
+        if policy.classify(response.status_code) != RETRY:
+            break
+        policy.record_failure(host)
+        time.sleep(policy.delay(attempt, response.headers.get("Retry-After")))
+
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+RETRY = "retry"
+FATAL = "fatal"
+
+# HTTP status codes worth retrying
+RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+# error messages (exceptions or yt-dlp output lines) of transient failures
+RETRY_MESSAGES = ("HTTP Error 429", "HTTP Error 5", "timed out", "Timeout", "ConnectionError", "Connection reset", "Connection refused",
+                  "Connection aborted", "Remote end closed", "IncompleteRead", "Temporary failure in name resolution",
+                  "Skipping fragment", "not found, unable to continue")
+
+
+def parse_retry_after(value):
+    '''
+    Returns the seconds to wait given by a Retry-After header (seconds or HTTP date); None if missing or malformed
+    '''
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy():
+    """
+        # max_retries: number of retries of a request after the first attempt
+        # base_delay, max_delay: the backoff of retry n is uniform in [0, min(max_delay, base_delay * 2**n)] seconds
+        # failure_threshold: transient failures in a row that open the breaker of a host
+        # reset_timeout: seconds the breaker of a host stays open
+
+    """
+    def __init__(self, max_retries=5, base_delay=1.0, max_delay=60.0, failure_threshold=5, reset_timeout=60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = {}
+        self.opened = {}
+        self.lock = threading.Lock()
+
+    # Transient or fatal failure
+    def classify(self, status=None, errors=()):
+        '''
+        Classifies a failed request
+
+        Args:
+        - status (int): The HTTP status code, if any
+        - errors (Exception, str or list): The exception or error lines, if any
+
+        Returns:
+        - str: RETRY for transient failures, else FATAL
+        '''
+        if status is not None:
+            return RETRY if status in RETRY_STATUS else FATAL
+        if isinstance(errors, (BaseException, str)):
+            errors = [errors]
+        for error in errors:
+            if isinstance(error, (TimeoutError, ConnectionError)):
+                return RETRY
+            text = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+            if any(message in text for message in RETRY_MESSAGES):
+                return RETRY
+        return FATAL
+
+    # Backoff before the next attempt
+    def delay(self, attempt, retry_after=None):
+        '''
+        Returns the seconds to wait before retry number attempt (starting at 0)
+
+        Args:
+        - attempt (int): The number of the retry
+        - retry_after (str or float): The Retry-After header of the response, if any
+
+        Returns:
+        - float: The delay in seconds
+        '''
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        server_delay = parse_retry_after(retry_after)
+        return backoff if server_delay is None else max(server_delay, backoff)
+
+    def record_success(self, host):
+        with self.lock:
+            self.failures.pop(host, None)
+            self.opened.pop(host, None)
+
+    def record_failure(self, host):
+        with self.lock:
+            self.failures[host] = self.failures.get(host, 0) + 1
+            if self.failures[host] >= self.failure_threshold:
+                self.opened[host] = time.monotonic()
+
+    # Circuit breaker of the host
+    def wait_time(self, host):
+        '''
+        Returns the seconds until requests to the host are allowed again; 0 if the breaker is closed
+        '''
+        with self.lock:
+            opened = self.opened.get(host)
+        if opened is None:
+            return 0.0
+        return max(0.0, opened + self.reset_timeout - time.monotonic())
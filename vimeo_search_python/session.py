@@ -0,0 +1,57 @@
+"""
+    Pooled HTTP session shared by the Vimeo searchers
+
+    Keeps the TCP+TLS connections alive between the pages, licenses and keywords of a search instead of opening a
+    new connection for every request. Compressed responses (gzip, deflate and brotli if the brotli package is
+    installed) are requested and decoded transparently.
+
+    Usage:
+    session = PooledSession(pool_size=10)
+    searcher = VimeoSearch(session=session)
+    ...
+    print(session.connection_stats())
+
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+
+class PooledSession(requests.Session):
+    """
+        # pool_size: number of keep-alive connections kept per host; use at least the number of concurrent requests
+    """
+    def __init__(self, pool_size=10):
+        super().__init__()
+        self.pool_size = pool_size
+        self.requests_sent = 0
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        # advertise every encoding urllib3 can decode; brotli only when it is installed
+        self.headers.update(make_headers(accept_encoding=True, keep_alive=True))
+
+    def request(self, *args, **kwargs):
+        self.requests_sent += 1
+        return super().request(*args, **kwargs)
+
+    # Connection reuse counters
+    def connection_stats(self):
+        '''
+        Returns the connection reuse counters of the session
+
+        Returns:
+        - dict: requests sent, connections opened and requests served on a reused connection
+        '''
+        connections = 0
+        for adapter in set(self.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                connections += pools[key].num_connections
+        return {
+            "requests": self.requests_sent,
+            "connections": connections,
+            "reused": max(self.requests_sent - connections, 0),
+        }
@@ -7,7 +7,10 @@
 
     Avoid getting blocked due to making too many requests: 
     NOTE: Use a random user agent for each request; see get_random_user_agent() function
-    NOTE: Use a random delay between requests; see random_delay() function; typical human behavior is 0.5-10 seconds between requests. 
+    NOTE: Requests are paced by an AdaptiveRateLimiter shared by all searchers; its rate goes up until Vimeo throttles (429) and then backs off.
+    NOTE: Requests go through a pooled keep-alive session; pass the same PooledSession to every searcher to share connections.
+    NOTE: With a CheckpointJournal, every searched page is journaled and a restarted search continues after the last journaled page.
+    NOTE: Rate limits (429), 5xx and dropped connections are retried with the RetryPolicy: jittered exponential backoff, Retry-After and a per host circuit breaker.
 
     Usage:
     searcher = VimeoSearch()
@@ -20,16 +23,19 @@
 
 """
 
-import requests
-from urllib.parse import quote_plus
-from json import loads
+from urllib.parse import quote_plus, urlsplit
 import csv
 import pandas as pd
 import time
-import random
+import requests
 from fake_useragent import UserAgent
 from bs4 import BeautifulSoup
 
+from .config_parser import iter_clips
+from .session import PooledSession
+from .retry_policy import RetryPolicy, RETRY
+from .rate_limiter import shared_rate_limiter
+
 class VimeoSearch():
     """ 
         # based on the combination of hdr, price and license, the url will be generated 
@@ -37,10 +43,14 @@ class VimeoSearch():
         # price: any, free, paid
         # resolution: any, 4k
         # license: any, by, cc0, by-nd, by-nc, by-sa, by-nc-nd, by-nc-sa, allCC
+        # session: PooledSession to share between searchers; a new one with pool_size connections is made if None
+        # journal: CheckpointJournal of the searched pages; None to disable checkpointing
+        # retry_policy: RetryPolicy to share between searchers; a new one is made if None
+        # rate_limiter: AdaptiveRateLimiter pacing the requests; the limiter shared by the process if None
         # NOTE: You can change the base url to get different results; just apply filter on vimeo and copy the url and paste it here.
 
     """
-    def __init__(self, base_vimeo_url="https://vimeo.com/search", hdr='hdr', price="free", license="allCC", resolution="any"):
+    def __init__(self, base_vimeo_url="https://vimeo.com/search", hdr='hdr', price="free", license="allCC", resolution="any", session=None, pool_size=10, journal=None, retry_policy=None, rate_limiter=None):
 
         self.cc= ['by', 'cc0', 'by-nd', 'by-nc', 'by-sa', 'by-nc-nd', 'by-nc-sa']
         self.license = license
@@ -60,8 +70,21 @@ class VimeoSearch():
         else:
             self.base_url = base_vimeo_url
         self.user_agent = UserAgent()
+        self.session = session if session is not None else PooledSession(pool_size)
+        self.journal = journal
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy(max_retries=8, max_delay=120.0)
+        self.rate_limiter = rate_limiter if rate_limiter is not None else shared_rate_limiter()
+        self.reset()
+
+    # Clear the collected results; used when a searcher is reused for a new keyword
+    def reset(self):
+        '''
+        Clears the collected results and IDs
+        '''
         self.all_results = []
         self.collected_ids = set()
+        # base title -> number of "I" to append to the next clip with this title
+        self.title_index = {}
 
     """
         Get the total number of pages for a given search query; 
@@ -80,9 +103,11 @@ class VimeoSearch():
         '''
         encoded_search = quote_plus(search_terms)
         url = f"{self.base_url}{encoded_search}&page=1"
-        headers = {'user-agent': self.get_random_user_agent()}
-        response = requests.get(url, headers=headers)
+        # paced and retried like the result pages
+        response = self.get_page(url)
 
+        if response is None:
+            return None
         if response.status_code != 200:
             print(f"Error: HTTP {response.status_code}")
             return None
@@ -110,15 +135,159 @@ class VimeoSearch():
         '''
         return self.user_agent.random
 
-    # Random delay between requests
-    def random_delay(self):
+    # Fetch a page, retrying the transient failures
+    def get_page(self, url):
+        '''
+        Fetches the url with the retry policy of the searcher
+
+        Args:
+        - url (str): The url to fetch
+
+        Returns:
+        - Response: The response, or None if the retries are exhausted
+        '''
+        host = urlsplit(url).netloc
+        policy = self.retry_policy
+        for attempt in range(policy.max_retries + 1):
+            wait = policy.wait_time(host)
+            if wait > 0:
+                print(f"Too many failures for {host}. Waiting {wait:.0f}s...")
+                time.sleep(wait)
+
+            time.sleep(self.rate_limiter.reserve())
+            headers = {'user-agent': self.get_random_user_agent()}
+            try:
+                response = self.session.get(url, headers=headers)
+            except requests.RequestException as e:
+                if policy.classify(errors=e) != RETRY:
+                    raise
+                print(f"Request failed: {e}")
+                retry_after = None
+            else:
+                self.rate_limiter.update(response.status_code)
+                if policy.classify(response.status_code) != RETRY:
+                    policy.record_success(host)
+                    return response
+                print(f"HTTP {response.status_code}. Waiting to retry...")
+                retry_after = response.headers.get("Retry-After")
+
+            policy.record_failure(host)
+            if attempt < policy.max_retries:
+                time.sleep(policy.delay(attempt, retry_after))
+        return None
+
+    # Build the search url for the given page
+    def page_url(self, url_comp, encoded_search, page):
+        '''
+        Returns the search url for a given page of the search results
+
+        Args:
+        - url_comp (str): The url components
+        - encoded_search (str): The search query
+        - page (int): The page number
+
+        Returns:
+        - str: The url of the page
         '''
-        Sleeps for a random amount of time between 0.0 and 0.1 seconds
+        # if page is 1 then url is simpler 
+        if page == 1:
+            return f"{self.base_url}{url_comp}q={encoded_search}"
+        if self.url_components == '':
+            return f"{self.base_url.split('?')[0]}/page:{page}?{self.base_url.split('?')[-1]}{url_comp}q={encoded_search}"
+        return f"{self.base_url}/page:{page}{url_comp}q={encoded_search}"
+
+    # Parse the clips of a search result page
+    def parse_page(self, text, license, encoded_search):
+        '''
+        Parses the vimeo.config blob of a search result page
+
+        Args:
+        - text (str): The html of the page
+        - license (str): The license type
+        - encoded_search (str): The search query
 
         Returns:
-        - float: The amount of time slept
+        - list: A list of dictionaries containing the page results
+        '''
+        temp_results = []
+        for content in iter_clips(text):
+            title = self.unique_title(content["clip"]["name"])
+
+            temp_results.append({
+                "url": content["clip"]["link"],
+                "id": content["clip"]["link"].split("/")[-1],
+                "play_time": content["clip"]["duration"],
+                "date": content["clip"]["created_time"][:7],
+                "channel": content["clip"]["user"]["name"],
+                "title": title, 
+                "license": license,
+                "keyword": encoded_search
+            })
+        return temp_results
+
+    # Merge the page results into all_results
+    def collect_results(self, temp_results):
         '''
-        time.sleep(random.uniform(0.0, 0.1))
+        Adds the page results whose IDs are not collected yet to all_results
+
+        Args:
+        - temp_results (list): The page results
+
+        Returns:
+        - int: The number of results that were already collected
+        '''
+        # check each id in temp with collected_ids; continue if id is already collected else add to collected_ids and append to all_results
+        already_collected = 0
+        for result in temp_results:
+            if result['url'].split('/')[-1] in self.collected_ids:
+                already_collected += 1
+                continue
+            self.collected_ids.add(result['url'].split('/')[-1])
+            self.all_results.append(result)
+            # titles are "<name> " followed by "I"s, so stripping the "I"s gives back the base title
+            base = result["title"].rstrip("I")
+            self.title_index[base] = max(self.title_index.get(base, 0), len(result["title"]) - len(base) + 1)
+        return already_collected
+
+    # Title which is not used by any collected result
+    def unique_title(self, name):
+        '''
+        Returns the clip name followed by a space and as many "I" as needed to differ from the collected titles
+
+        Args:
+        - name (str): The clip name
+
+        Returns:
+        - str: The title of the clip
+        '''
+        base = name + " "
+        return base + "I" * self.title_index.get(base, 0)
+
+    # The (url components, license) pairs to query for the search
+    def license_components(self):
+        '''
+        Returns the url components and license for each query of a search
+
+        Returns:
+        - list: A list of (url_comp, license) tuples
+        '''
+        # if license is allCC then loop through all cc licenses else query for the given license type
+        if self.license == "allCC":
+            return [(self.url_components+f"license={li}&", li) for li in self.cc]
+        return [(self.url_components, self.license)]
+
+    # Whether the journal has every license of the search as done
+    def is_searched(self, search_terms):
+        '''
+        Returns True if every query of the search is journaled as done; a restarted search then sends no request
+
+        Args:
+        - search_terms (str): The search query
+        '''
+        if self.journal is None:
+            return False
+        encoded_search = quote_plus(search_terms)
+        return all(self.journal.is_done(encoded_search, li) for _, li in self.license_components())
 
     # Query Vimeo search results for a given search query
     def query_vimeo(self, url_comp, encoded_search, license):
@@ -135,30 +304,30 @@ class VimeoSearch():
         '''
         page = 1
         end_count = 0
+
+        # Replay the pages journaled by a previous run and continue after the last one
+        if self.journal is not None:
+            for temp_results in self.journal.completed_pages(encoded_search, license):
+                end_count += self.collect_results(temp_results)
+                page += 1
+            if self.journal.is_done(encoded_search, license):
+                print(f"Already searched: {encoded_search} ({license}), {page-1} pages")
+                return
         
         # Loop through all pages
         while True:
             # Get the search results for the current page
-            temp_results = []
-            # if page is 1 then url is simpler 
-            if page == 1:
-                url = f"{self.base_url}{url_comp}q={encoded_search}"
-            else:
-                if self.url_components == '':
-                    url = f"{self.base_url.split('?')[0]}/page:{page}?{self.base_url.split('?')[-1]}{url_comp}q={encoded_search}"
-                else: 
-                    url = f"{self.base_url}/page:{page}{url_comp}q={encoded_search}"
+            url = self.page_url(url_comp, encoded_search, page)
             print(url)
             
-            # Make the request
-            headers = {'user-agent': self.get_random_user_agent()}
-            response = requests.get(url, headers=headers)
+            # Make the request; transient failures are retried by get_page
+            response = self.get_page(url)
 
             # Handle HTTP Status Codes
-            if response.status_code == 429:
-                print("Rate limited. Waiting to retry...")
-                time.sleep(60)  # longer delay if rate limited
-                continue
+            if response is None:
+                # not journaled as done, so the next run continues from this page
+                print(f"Giving up on {encoded_search} ({license}) after {self.retry_policy.max_retries} retries")
+                return
             elif response.status_code == 400:
                 print(f"Reached the end of the results! Stopping...")
                 break
@@ -169,28 +338,7 @@ class VimeoSearch():
             
             # Parse the response
             try:
-                index1 = response.text.index("vimeo.config = ")
-                index1 = response.text.index("[", index1)
-                index2 = response.text.index("}}}]", index1) + 4
-                text = response.text[index1:index2]
-                dicti = loads(text)
-
-                for content in dicti:
-                    title = content["clip"]["name"] + " "
-                    while title in [video["title"] for video in self.all_results]:
-                        title += "I"
-
-                    temp_results.append({
-                        "url": content["clip"]["link"],
-                        "id": content["clip"]["link"].split("/")[-1],
-                        "play_time": content["clip"]["duration"],
-                        "date": content["clip"]["created_time"][:7],
-                        "channel": content["clip"]["user"]["name"],
-                        "title": title, 
-                        "license": license,
-                        "keyword": encoded_search
-                    })
-                    
+                temp_results = self.parse_page(response.text, license, encoded_search)
             except Exception as e:
                 print(f"An error occurred: {e}")
                 # if license is allCC then break the loop else continue
@@ -211,28 +359,19 @@ class VimeoSearch():
                 break
             
             # check if all ids are already collected then break the loop
-            temp_ids = []
-            for result in temp_results:
-                # check each id in temp with collected_ids; continue if id is already collected else add to collected_ids and append to all_results; if all ids are already collected then break the loop 
-                if result['url'].split('/')[-1] in self.collected_ids:
-                    end_count += 1
-                    temp_ids.append(result['url'].split('/')[-1])
-                    continue
-                else:
-                    self.collected_ids.add(result['url'].split('/')[-1])
-                    self.all_results.append(result)
-            
-            #print(end_count, len(temp_results))
-            #print(collected_ids, temp_ids)
+            end_count += self.collect_results(temp_results)
+            if self.journal is not None:
+                self.journal.record_page(encoded_search, license, page, temp_results)
                     
             # if all ids are already collected then break the loop            
             if end_count == len(temp_results):
                 break
             
-            # Random delay after each request
-            self.random_delay()
             print(f"Scrapped page {page}...")
             page += 1
+
+        if self.journal is not None:
+            self.journal.record_done(encoded_search, license)
         
         return 
         
@@ -252,13 +391,8 @@ class VimeoSearch():
         encoded_search = quote_plus(search_terms)
         
         # if license is allCC then loop through all cc licenses else query for the given license type
-        if self.license == "allCC":
-            for li in self.cc:
-                url_comp = self.url_components+f"license={li}&"
-                self.query_vimeo(url_comp, encoded_search,li)
-        else: 
-            url_comp = self.url_components
-            self.query_vimeo(url_comp, encoded_search, self.license)
+        for url_comp, li in self.license_components():
+            self.query_vimeo(url_comp, encoded_search, li)
         
         # return list of dictionaries containing the search results         
         return self.all_results